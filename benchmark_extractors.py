@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for the text extractors
+
+Runs extract_morphology_terms (extract_terms.py), extract_terms_with_definitions
+(extract_terms_correct.py), extract_structured_terms (extract_terms_old.py) and
+extract_figure_captions (document_model.py) on every data/*.txt and on a
+synthetic glossary scaled 1×, 10× and 100×, and reports per extractor:
+
+    throughput   MB of text per second over the corpus (best of --repeat runs)
+    peak memory  largest tracemalloc peak over one run per input
+    exponent     slope of log(time) against log(size) over the synthetic
+                 scales: ~1 is linear, 2 quadratic
+
+Outputs for the corpus and for the 1× synthetic input are compared with
+benchmarks/golden/<extractor>.json (regenerate with --update-golden after an
+intended output change). Timings are compared with benchmarks/baseline.json,
+written by --save-baseline on the same machine. The exit status is 1 when an
+output differs from the golden file, an extractor got slower than the baseline
+by more than SLOWDOWN_FACTOR or an exponent exceeds MAX_SCALING_EXPONENT.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from document_model import extract_figure_captions
+from extract_terms import extract_morphology_terms
+from extract_terms_correct import extract_terms_with_definitions
+from extract_terms_old import extract_structured_terms
+
+DATA_DIR = "data"
+BENCHMARK_DIR = "benchmarks"
+GOLDEN_DIR = os.path.join(BENCHMARK_DIR, "golden")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+EXTRACTORS = {
+    'morphology_terms': lambda text, name: extract_morphology_terms(text, name),
+    'terms_with_definitions': lambda text, name: extract_terms_with_definitions(text, name),
+    'structured_terms': lambda text, name: extract_structured_terms(text, name),
+    'figure_captions': lambda text, name: extract_figure_captions(text),
+}
+
+SCALES = (1, 10, 100)
+# Synthetic glossary entries at scale 1 (about 35 KB of text)
+SYNTHETIC_ENTRIES = 120
+SYNTHETIC_SEED = 1234
+SYNTHETIC_NAME = "synthetic_1x.txt"
+
+# Verdict thresholds
+SLOWDOWN_FACTOR = 1.5
+MAX_SCALING_EXPONENT = 1.3
+
+WORDS = ("lateral medial upper lower anterior posterior distance between the of and "
+         "helix philtrum nasal bridge palpebral fissure ear lobe crus crease outer inner "
+         "angle width length margin prominent narrow wide short long deep shallow").split()
+
+def corpus_files():
+    return sorted(glob.glob(os.path.join(DATA_DIR, "*.txt")))
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def synthetic_words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+def letter_suffix(number):
+    """1 -> "a", 27 -> "aa": term headers may not contain digits"""
+    suffix = ''
+    while number:
+        number, digit = divmod(number - 1, 26)
+        suffix = chr(ord('a') + digit) + suffix
+    return suffix
+
+def synthetic_entry(rng, number):
+    """One glossary entry in the layouts found in the PDFs"""
+    term = f"{synthetic_words(rng, rng.randint(1, 3)).capitalize()} {letter_suffix(number)}"
+    definition = synthetic_words(rng, rng.randint(12, 30))
+    layout = rng.random()
+    if layout < 0.5:
+        # Block layout: header line, "Definition:" and an optional comment
+        lines = [term, f"Definition: {definition}. {rng.choice(['Objective', 'Subjective'])}"]
+        if rng.random() < 0.4:
+            lines.append(f"  Comment: {synthetic_words(rng, rng.randint(8, 20))}.")
+    elif layout < 0.75:
+        # Two-column layout: two headers side by side
+        other = f"{synthetic_words(rng, 2).capitalize()} {letter_suffix(number)}x"
+        lines = [f"{term}          {other}",
+                 f"Definition: {definition}.     Definition: {synthetic_words(rng, 15)}."]
+    else:
+        # "Term: definition" on one line, wrapped
+        lines = [f"{term}: {definition}", synthetic_words(rng, rng.randint(5, 12)) + '.']
+    if rng.random() < 0.2:
+        lines.append(f"FIG. {number}. {synthetic_words(rng, rng.randint(6, 25)).capitalize()}.")
+    if rng.random() < 0.3:
+        lines.append(f"See Fig. {rng.randint(1, number)} and {synthetic_words(rng, 10)}.")
+    return '\n'.join(lines) + '\n\n'
+
+def synthetic_text(scale):
+    """Deterministic synthetic glossary; each scale adds new entries, not copies"""
+    rng = random.Random(SYNTHETIC_SEED)
+    return ''.join(synthetic_entry(rng, number)
+                   for number in range(1, SYNTHETIC_ENTRIES * scale + 1))
+
+def canonical(result):
+    """Output as it round-trips through JSON (tuples -> lists, int keys -> str)"""
+    return json.loads(json.dumps(result))
+
+def time_run(extractor, text, name, repeat):
+    """Best wall time over repeat runs, and the last result"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extractor(text, name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def peak_memory(extractor, text, name):
+    """tracemalloc peak (bytes) of one run; timed separately, tracing is slow"""
+    tracemalloc.start()
+    try:
+        extractor(text, name)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def scaling_exponent(points):
+    """Least-squares slope of log(seconds) over log(bytes)"""
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(seconds, 1e-9)) for _, seconds in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+def benchmark_extractor(extractor, corpus, synthetic, repeat):
+    """Timings, memory and outputs of one extractor"""
+    outputs = {}
+    corpus_bytes = corpus_seconds = 0
+    peak = 0
+    for name, text in corpus:
+        seconds, result = time_run(extractor, text, name, repeat)
+        outputs[name] = canonical(result)
+        corpus_bytes += len(text.encode('utf-8'))
+        corpus_seconds += seconds
+        peak = max(peak, peak_memory(extractor, text, name))
+
+    scales = []
+    for scale, text in synthetic:
+        seconds, result = time_run(extractor, text, SYNTHETIC_NAME, repeat)
+        size = len(text.encode('utf-8'))
+        if scale == 1:
+            outputs[SYNTHETIC_NAME] = canonical(result)
+        scales.append({'scale': scale, 'bytes': size, 'seconds': round(seconds, 6),
+                       'mb_per_s': round(size / 1e6 / seconds, 3) if seconds else None})
+        peak = max(peak, peak_memory(extractor, text, SYNTHETIC_NAME))
+
+    exponent = scaling_exponent([(s['bytes'], s['seconds']) for s in scales])
+    return {
+        'corpus_bytes': corpus_bytes,
+        'corpus_seconds': round(corpus_seconds, 6),
+        'mb_per_s': round(corpus_bytes / 1e6 / corpus_seconds, 3) if corpus_seconds else None,
+        'peak_memory_mb': round(peak / 1e6, 2),
+        'scaling_exponent': round(exponent, 3) if exponent is not None else None,
+        'scales': scales,
+    }, outputs
+
+def golden_path(extractor_name):
+    return os.path.join(GOLDEN_DIR, f"{extractor_name}.json")
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+def load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_outputs(outputs, golden):
+    """Names of inputs whose output differs from (or is missing in) the golden file"""
+    if golden is None:
+        return sorted(outputs)
+    return sorted(name for name in set(outputs) | set(golden)
+                  if outputs.get(name) != golden.get(name))
+
+def verdict(name, result, mismatches, baseline):
+    """Failure messages for one extractor (empty when it passes)"""
+    failures = []
+    if mismatches:
+        shown = ', '.join(mismatches[:3]) + (' …' if len(mismatches) > 3 else '')
+        failures.append(f"output differs from golden for {len(mismatches)} input(s): {shown}")
+    exponent = result['scaling_exponent']
+    if exponent is not None and exponent > MAX_SCALING_EXPONENT:
+        failures.append(f"scaling exponent {exponent:.2f} > {MAX_SCALING_EXPONENT}")
+    previous = (baseline or {}).get(name)
+    if previous and previous.get('mb_per_s') and result['mb_per_s']:
+        if result['mb_per_s'] * SLOWDOWN_FACTOR < previous['mb_per_s']:
+            failures.append(f"throughput {result['mb_per_s']:.2f} MB/s, "
+                            f"baseline {previous['mb_per_s']:.2f} MB/s")
+    return failures
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extractor', action='append', choices=sorted(EXTRACTORS),
+                        help='only benchmark this extractor (repeatable)')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES),
+                        help=f"synthetic input scales (default: {' '.join(map(str, SCALES))})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed runs per input; the best one counts (default: 3)')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='write the current outputs as the golden files')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'write the current timings to {BASELINE_PATH}')
+    parser.add_argument('--report', help='also write the full results as JSON to this path')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    names = args.extractor or list(EXTRACTORS)
+    scales = sorted(set(args.scales) | {1})
+
+    corpus = [(os.path.basename(path), read_text(path)) for path in corpus_files()]
+    synthetic = [(scale, synthetic_text(scale)) for scale in scales]
+    print(f"📏 {len(corpus)} documents ({sum(len(t.encode('utf-8')) for _, t in corpus) / 1e6:.2f} MB), "
+          f"synthetic scales {', '.join(f'{s}×' for s in scales)} "
+          f"({len(synthetic[-1][1].encode('utf-8')) / 1e6:.2f} MB at {scales[-1]}×)")
+    print()
+
+    baseline = load_json(BASELINE_PATH)
+    results = {}
+    failed = False
+    print(f"   {'extractor':24} {'MB/s':>8} {'peak MB':>8} {'exponent':>9}  verdict")
+    for name in names:
+        result, outputs = benchmark_extractor(EXTRACTORS[name], corpus, synthetic, args.repeat)
+        if args.update_golden:
+            save_json(outputs, golden_path(name))
+            mismatches = []
+        else:
+            mismatches = compare_outputs(outputs, load_json(golden_path(name)))
+        failures = verdict(name, result, mismatches, baseline)
+        result['failures'] = failures
+        results[name] = result
+        failed = failed or bool(failures)
+
+        exponent = result['scaling_exponent']
+        exponent = f"{exponent:.2f}" if exponent is not None else '-'
+        print(f"   {name:24} {result['mb_per_s'] or 0:8.2f} {result['peak_memory_mb']:8.2f} "
+              f"{exponent:>9}  {'✗' if failures else '✓'}")
+        for failure in failures:
+            print(f"      ⚠️  {failure}")
+
+    print()
+    if args.update_golden:
+        print(f"✓ Golden outputs saved to {GOLDEN_DIR}/")
+    if args.save_baseline:
+        save_json({name: {'mb_per_s': r['mb_per_s'], 'scaling_exponent': r['scaling_exponent']}
+                   for name, r in results.items()}, BASELINE_PATH)
+        print(f"✓ Baseline saved to {BASELINE_PATH}")
+    if args.report:
+        save_json(results, args.report)
+        print(f"✓ Report saved to {args.report}")
+
+    if failed:
+        print("❌ Benchmark failed")
+        sys.exit(1)
+    print("✅ All extractors match the golden outputs and scale within limits")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Publish content-hashed copies of the web app's data and images
+
+nginx serves png/json/webp with a one-year immutable cache, so a file whose
+name is reused across rebuilds (morphology_terms.json, ...-003.png) stays
+stale in returning browsers. This script copies every asset the app loads
+into assets/ under a name carrying a hash of its content
+(`morphology_terms.3f9c2a1b7e4d.json`) and writes assets/manifest.json, the
+only unhashed file, mapping logical paths to hashed URLs. index.html loads
+the manifest first (revalidated on every visit) and resolves every fetch
+and image through it.
+
+The Docker build runs it in its first stage and ships assets/ in place of
+data/organized/ and images/; run it locally to try the hashed layout.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+ASSETS_DIR = "assets"
+MANIFEST_PATH = os.path.join(ASSETS_DIR, "manifest.json")
+
+# (directory, extensions) published to assets/, keeping the relative path
+SOURCES = (
+    ("data/organized", ('.json',)),
+    ("images", ('.png',)),
+    ("images/derivatives", ('.webp', '.png', '.json')),
+)
+HASH_LENGTH = 12
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_sources():
+    """Logical paths (as index.html requests them) of every asset to publish"""
+    paths = []
+    for directory, extensions in SOURCES:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = f"{directory}/{name}"
+            if name.endswith(extensions) and os.path.isfile(path):
+                paths.append(path)
+    return paths
+
+def hashed_path(logical_path, digest):
+    """assets/<dir>/<stem>.<hash>.<ext> for a logical path"""
+    stem, ext = os.path.splitext(logical_path)
+    return f"{ASSETS_DIR}/{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+def publish(source, target):
+    """Copy the source to its hashed name; False if it already exists.
+
+    A copy rather than a hard link: the pipeline rewrites sources in place
+    (optimize_pngs.py), which would change a linked "immutable" file too.
+    """
+    if os.path.exists(target):
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, target)
+    return True
+
+def remove_unreferenced(manifest):
+    """Delete hashed files no longer listed in the manifest"""
+    referenced = set(manifest.values()) | {MANIFEST_PATH}
+    removed = 0
+    for root, _, files in os.walk(ASSETS_DIR):
+        for name in files:
+            path = os.path.join(root, name).replace(os.sep, '/')
+            if path not in referenced:
+                os.remove(path)
+                removed += 1
+    return removed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keep-old', action='store_true',
+                        help='keep hashed files of previous builds (for clients still holding an old manifest)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+
+    manifest = {}
+    created = 0
+    for logical_path in list_sources():
+        target = hashed_path(logical_path, file_sha256(logical_path))
+        created += publish(logical_path, target)
+        manifest[logical_path] = target
+
+    removed = 0 if args.keep_old else remove_unreferenced(manifest)
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"🔖 {len(manifest)} assets: {created} new hashed files, "
+          f"{len(manifest) - created} unchanged, {removed} stale removed")
+    print(f"✓ Manifest saved to {MANIFEST_PATH}")
+
+if __name__ == '__main__':
+    main()
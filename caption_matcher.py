@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Caption term matching through an inverted token index
+
+extract_terms_from_caption() used to score every term against every
+caption, re-normalizing both each time. build_term_index() normalizes the
+term list once and indexes it; match_caption() then only looks at the
+terms a caption can match, in term-list order:
+
+    exact     the term's words, or those of its comma-inverted alias
+              ("Lip, Upper" -> "upper lip", see term_ids.inverted_term),
+              occur as whole words in the caption. A word-level
+              Aho-Corasick automaton of all these word sequences finds
+              every occurrence in one pass over the caption, so the cost
+              follows the caption length, not the vocabulary; each match
+              reports the character ranges it covers in the caption
+              ('caption_spans') for highlighting
+    partial   at least 70% of a multi-word term's words (longer than two
+              characters) are caption words: looked up by caption word
+    fuzzy     a term longer than 8 characters, or its comma-inverted
+              alias, differs from a run of caption words only by
+              spelling variants: plural suffixes ("palpebral fissures",
+              "nails, hyperconvex") and hyphen or space differences
+              ("supra-orbital" for "supraorbital", "palpe bral"). Each
+              side is reduced to a key, its words in singular form
+              joined without spaces, and the caption's word runs are
+              looked up in a key -> terms table, so a word never
+              differs by more than its plural suffix and never in its
+              stem: "Microcephaly" does not match "Macrocephaly" nor
+              "Hand, Small" "has small". The match reports the caption
+              ranges of the runs and 1 - edits / longer length as
+              confidence
+"""
+import re
+from collections import defaultdict
+
+from term_ids import inverted_term
+
+MIN_SIMILARITY = 0.8
+# Share of a multi-word term's words that must appear in the caption
+PARTIAL_SHARE = 0.7
+# Words this short are ignored by partial matching
+MIN_WORD_LENGTH = 3
+# Only terms longer than this are fuzzy matched
+FUZZY_MIN_LENGTH = 9
+# Word endings that are not plural suffixes ("cross", "hirsutus", "iris")
+NOT_PLURAL = ('ss', 'us', 'is')
+
+def normalize_term(term):
+    """Normalize term for better matching"""
+    # Convert to lowercase and remove punctuation
+    normalized = term.lower()
+    normalized = re.sub(r'[^\w\s]', ' ', normalized)
+    normalized = ' '.join(normalized.split())
+    return normalized
+
+# A word of normalized text: everything normalize_term() does not turn into a space
+WORD = re.compile(r'\w+')
+
+def caption_words(caption):
+    """(word, start, end) of the words of normalize_term(caption), with offsets into caption"""
+    lowered = caption.lower()
+    if len(lowered) == len(caption):
+        return [(match.group(), match.start(), match.end()) for match in WORD.finditer(lowered)]
+    # Lowercasing changed the length (e.g. 'İ'): lowercase character by character
+    positions = []
+    for position, char in enumerate(caption):
+        positions.extend([position] * len(char.lower()))
+    lowered = ''.join(char.lower() for char in caption)
+    return [(match.group(), positions[match.start()], positions[match.end() - 1] + 1)
+            for match in WORD.finditer(lowered)]
+
+def build_automaton(patterns):
+    """Word-level Aho-Corasick automaton of (words, value) patterns.
+
+    States are numbered; transitions live in one (state, word) -> state
+    dict. 'fail' is the state of the longest proper suffix that is also a
+    pattern prefix, 'next_output' the nearest such suffix state ending a
+    pattern.
+    """
+    goto = {}
+    depth = [0]
+    output = [[]]
+    for words, value in patterns:
+        state = 0
+        for word in words:
+            child = goto.get((state, word))
+            if child is None:
+                child = goto[(state, word)] = len(depth)
+                depth.append(depth[state] + 1)
+                output.append([])
+            state = child
+        output[state].append(value)
+
+    children = defaultdict(list)
+    for (state, word), child in goto.items():
+        children[state].append((word, child))
+    fail = [0] * len(depth)
+    next_output = [0] * len(depth)
+    # Breadth first: a state's fail link is shorter, so it is already set
+    queue = [child for _, child in children[0]]
+    for state in queue:
+        for word, child in children[state]:
+            suffix = fail[state]
+            while suffix and (suffix, word) not in goto:
+                suffix = fail[suffix]
+            fail[child] = goto.get((suffix, word), 0)
+            next_output[child] = fail[child] if output[fail[child]] else next_output[fail[child]]
+            queue.append(child)
+    return {'goto': goto, 'fail': fail, 'depth': depth, 'output': output, 'next_output': next_output}
+
+def scan_words(automaton, words):
+    """(first word, end word, value) of every pattern occurrence in a word sequence, in one pass"""
+    goto, fail, depth = automaton['goto'], automaton['fail'], automaton['depth']
+    output, next_output = automaton['output'], automaton['next_output']
+    state = 0
+    for end, word in enumerate(words, 1):
+        while state and (state, word) not in goto:
+            state = fail[state]
+        state = goto.get((state, word), 0)
+        found = state if output[state] else next_output[state]
+        while found:
+            for value in output[found]:
+                yield end - depth[found], end, value
+            found = next_output[found]
+
+def singular(word):
+    """A word without its plural suffix: anomalies -> anomaly, boxes -> box, nails -> nail"""
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(NOT_PLURAL) and len(word) > 3:
+        return word[:-1]
+    return word
+
+def variant_key(words):
+    """Fuzzy lookup key of a word sequence: singular words joined without spaces"""
+    return ''.join(singular(word) for word in words)
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or None once it is certain to exceed limit.
+
+    Only the diagonal band of width 2 * limit + 1 is computed, and the
+    computation stops as soon as a whole row of the band is over the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != b[j - 1]))
+        if min(current[low - 1:high + 1]) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+def build_term_index(term_list, min_similarity=MIN_SIMILARITY):
+    """Normalized terms and their lookup tables; built once per term list"""
+    index = {
+        'terms': list(term_list),
+        'normalized': [],
+        'words': [],
+        # word -> multi-word terms containing it (partial)
+        'words_index': defaultdict(list),
+        # variant key -> (term number, normalized variant) of fuzzy-matched terms
+        'variants': defaultdict(set),
+        # longest caption word run a variant key can come from
+        'max_run': 0,
+        'min_similarity': min_similarity,
+    }
+    patterns = []
+    for number, term in enumerate(index['terms']):
+        normalized = normalize_term(term)
+        words = normalized.split()
+        index['normalized'].append(normalized)
+        index['words'].append(words)
+        # Exact: the term and its comma-inverted alias
+        inverted = inverted_term(term)
+        variants = {normalized, normalize_term(inverted) if inverted else normalized}
+        patterns.extend((variant.split(), number) for variant in variants if variant)
+        if len(words) > 1:
+            for word in set(words):
+                if len(word) >= MIN_WORD_LENGTH:
+                    index['words_index'][word].append(number)
+        if len(normalized) >= FUZZY_MIN_LENGTH:
+            for variant in variants:
+                if variant:
+                    index['variants'][variant_key(variant.split())].add((number, variant))
+                    # A word split by the PDF text adds one word to the run
+                    index['max_run'] = max(index['max_run'], len(variant.split()) + 1)
+    index['automaton'] = build_automaton(patterns)
+    return index
+
+def exact_matches(index, words):
+    """term number -> caption character ranges of its whole-word occurrences"""
+    spans = defaultdict(set)
+    for first, end, number in scan_words(index['automaton'], [word for word, _, _ in words]):
+        spans[number].add((words[first][1], words[end - 1][2]))
+    return {number: [list(span) for span in sorted(ranges)] for number, ranges in spans.items()}
+
+def fuzzy_matches(index, words):
+    """term number -> (similarity, caption ranges of the closest word runs) for fuzzy-matched terms.
+
+    Every run of caption words up to the longest term (plus one split word)
+    is reduced to its variant key and looked up; the key is extended one
+    word at a time, so each run costs one dict lookup.
+    """
+    min_similarity = index['min_similarity']
+    variants = index['variants']
+    best = {}
+    for first in range(len(words)):
+        key = ''
+        for last in range(first, min(len(words), first + index['max_run'])):
+            key += singular(words[last][0])
+            numbers = variants.get(key)
+            if not numbers:
+                continue
+            window = ' '.join(word for word, _, _ in words[first:last + 1])
+            span = [words[first][1], words[last][2]]
+            for number, variant in sorted(numbers):
+                longer = max(len(variant), len(window))
+                distance = bounded_edit_distance(variant, window, longer)
+                similarity = 1 - distance / longer
+                if similarity < min_similarity:
+                    continue
+                if number not in best or similarity > best[number][0]:
+                    best[number] = (similarity, [span])
+                elif similarity == best[number][0]:
+                    best[number][1].append(span)
+    return best
+
+def caption_candidates(index, word_set, exact, fuzzy):
+    """Term numbers that may match a caption, in term-list order"""
+    candidates = set(exact) | set(fuzzy)
+    words_index = index['words_index']
+    for word in word_set:
+        candidates.update(words_index.get(word, ()))
+    return sorted(candidates)
+
+def match_caption(index, caption):
+    """Terms of an index that appear in a caption, as extract_terms_from_caption() returns them"""
+    words = caption_words(caption)
+    word_set = {word for word, _, _ in words}
+    exact = exact_matches(index, words)
+    fuzzy = fuzzy_matches(index, words)
+    found_terms = []
+
+    for number in caption_candidates(index, word_set, exact, fuzzy):
+        term = index['terms'][number]
+
+        # Exact match (whole words)
+        if number in exact:
+            found_terms.append({
+                'term': term,
+                'match_type': 'exact',
+                'confidence': 1.0,
+                'caption_spans': exact[number]
+            })
+            continue
+
+        # Check if most words of the term appear in the caption
+        term_words = index['words'][number]
+        if len(term_words) > 1:
+            matches = sum(1 for word in term_words
+                          if len(word) >= MIN_WORD_LENGTH and word in word_set)
+            if matches >= len(term_words) * PARTIAL_SHARE:
+                found_terms.append({
+                    'term': term,
+                    'match_type': 'partial',
+                    'confidence': matches / len(term_words)
+                })
+                continue
+
+        # Near match of a run of caption words
+        if number in fuzzy:
+            similarity, spans = fuzzy[number]
+            found_terms.append({
+                'term': term,
+                'match_type': 'fuzzy',
+                'confidence': similarity,
+                'caption_spans': spans
+            })
+
+    return found_terms
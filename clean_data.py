@@ -3,9 +3,12 @@
 Clean and improve morphology terms data
 """
 import json
+import os
 import re
 from collections import defaultdict
 
+from term_ids import alias_index_path, build_alias_index, lookup_term_id, term_id
+
 OUTPUT_DIR = "data/organized"
 
 def clean_definition(definition):
@@ -132,6 +135,9 @@ def main():
     see_references = {}
     
     for term in terms:
+        # Terms extracted before IDs existed get theirs here
+        term.setdefault('id', term_id(term['term']))
+        
         # Clean definition
         original_def = term['definition']
         cleaned_def = clean_definition(original_def)
@@ -149,6 +155,12 @@ def main():
         
         cleaned_terms.append(term)
     
+    # Resolve "see" targets to term IDs (alias index: case, accent, hyphen and comma variants)
+    alias_index = build_alias_index(cleaned_terms)
+    for term in cleaned_terms:
+        if term['id'] in alias_index['references']:
+            term['reference_id'] = alias_index['references'][term['id']]
+    
     # Clean images and remove duplicates
     print()
     print("🖼️  Limpiando imágenes y eliminando duplicados...")
@@ -167,7 +179,9 @@ def main():
                 cleaned_imgs.append(img_data)
         
         if cleaned_imgs:
-            cleaned_images[term_name] = cleaned_imgs
+            # Keyed by term ID, so later renames or translations keep the join
+            key = lookup_term_id(alias_index, term_name) or term_name
+            cleaned_images.setdefault(key, []).extend(cleaned_imgs)
             if len(images_data) != len(cleaned_imgs):
                 print(f"  ✂️  {term_name[:45]:45}: {len(images_data)} → {len(cleaned_imgs)} imágenes")
     
@@ -199,13 +213,19 @@ def main():
         json.dump(see_references, f, indent=2, ensure_ascii=False)
     print(f"  ✅ term_references.json creado")
     
+    # Save the term list's alias index (now with the "see" references)
+    alias_file = alias_index_path(f"{OUTPUT_DIR}/morphology_terms.json")
+    with open(alias_file, 'w', encoding='utf-8') as f:
+        json.dump(alias_index, f, indent=2, ensure_ascii=False)
+    print(f"  ✅ {os.path.basename(alias_file)} actualizado")
+    
     # Statistics
     print()
     print("="*70)
     print("📊 ESTADÍSTICAS")
     print("="*70)
     print(f"  Términos totales:              {len(cleaned_terms)}")
-    print(f"  Términos con referencia 'see': {len(see_references)}")
+    print(f"  Términos con referencia 'see': {len(see_references)} ({len(alias_index['references'])} resueltas a un ID)")
     print(f"  Términos con imágenes:         {len(cleaned_images)}")
     
     # Calculate total images before and after
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Reading-order text from `pdftotext -bbox-layout` word boxes
+
+`pdftotext -layout` prints the two journal columns side by side on the same
+lines, which the term extractors then have to pull apart with regexes.
+Here the column gutter of each page is found from the word boxes and the
+page is emitted column by column, so extractors get single-column text.
+Everything is linear in the number of words plus the page size in points.
+"""
+import xml.etree.ElementTree as ET
+
+# Part of the page width where a gutter may lie
+GUTTER_BAND = (0.3, 0.7)
+# Lines allowed to cross the gutter (titles, wide tables), as a fraction of all lines
+MAX_SPANNING_FRACTION = 0.05
+# Narrowest empty strip (points) accepted as a gutter
+MIN_GUTTER_WIDTH = 6
+# Each column must hold at least this fraction of the page's words
+MIN_COLUMN_SHARE = 0.2
+
+def parse_pages(xhtml):
+    """Pages as (width, height, lines); a line is (block_id, words) and a word is (xMin, yMin, xMax, yMax, text)"""
+    root = ET.fromstring(xhtml)
+    pages = []
+    for page in root.iterfind('.//{*}page'):
+        lines = []
+        for block_id, block in enumerate(page.iterfind('.//{*}block')):
+            for line in block.iterfind('{*}line'):
+                words = [
+                    (float(w.get('xMin')), float(w.get('yMin')), float(w.get('xMax')), float(w.get('yMax')), w.text or '')
+                    for w in line.iterfind('{*}word')
+                ]
+                if words:
+                    lines.append((block_id, words))
+        pages.append((float(page.get('width')), float(page.get('height')), lines))
+    return pages
+
+def find_gutter(width, lines):
+    """x of the column gutter of a page, or None if it is single-column.
+
+    Word coverage is accumulated with a difference array over integer x, so
+    the cost is one pass over the words plus one over the page width.
+    """
+    size = int(width) + 2
+    diff = [0] * (size + 1)
+    word_count = 0
+    for _, words in lines:
+        for x0, _, x1, _, _ in words:
+            diff[max(0, min(size - 1, int(x0)))] += 1
+            diff[max(0, min(size - 1, int(x1) + 1))] -= 1
+            word_count += 1
+    if not word_count:
+        return None
+
+    threshold = MAX_SPANNING_FRACTION * len(lines)
+    band_start, band_end = int(width * GUTTER_BAND[0]), int(width * GUTTER_BAND[1])
+
+    # Widest run of (almost) empty x positions inside the band
+    coverage = 0
+    best_start = best_len = run_start = 0
+    in_run = False
+    for x in range(size):
+        coverage += diff[x]
+        empty = band_start <= x <= band_end and coverage <= threshold
+        if empty and not in_run:
+            run_start, in_run = x, True
+        elif not empty and in_run:
+            in_run = False
+            if x - run_start > best_len:
+                best_start, best_len = run_start, x - run_start
+    if in_run and size - run_start > best_len:
+        best_start, best_len = run_start, size - run_start
+
+    if best_len < MIN_GUTTER_WIDTH:
+        return None
+    gutter = best_start + best_len / 2
+
+    left = sum(1 for _, words in lines for w in words if w[2] <= gutter)
+    right = sum(1 for _, words in lines for w in words if w[0] >= gutter)
+    if min(left, right) < MIN_COLUMN_SHARE * word_count:
+        return None
+    return gutter
+
+def split_line(words, gutter):
+    """(left_words, right_words), or None when a word crosses the gutter"""
+    left, right = [], []
+    for word in words:
+        if word[2] <= gutter:
+            left.append(word)
+        elif word[0] >= gutter:
+            right.append(word)
+        else:
+            return None
+    return left, right
+
+def emit_column(column, out):
+    """Append column lines to out, with a blank line between text blocks"""
+    previous_block = None
+    for block_id, text in column:
+        if previous_block is not None and block_id != previous_block:
+            out.append('')
+        out.append(text)
+        previous_block = block_id
+    column.clear()
+
+def page_text(width, height, lines):
+    """Text of one page in reading order"""
+    gutter = find_gutter(width, lines)
+
+    # Bucket lines by their top y (integer points) instead of sorting them
+    buckets = [[] for _ in range(int(height) + 2)]
+    for line in lines:
+        y = max(0, min(len(buckets) - 1, int(min(w[1] for w in line[1]))))
+        buckets[y].append(line)
+
+    out, left, right = [], [], []
+
+    def flush():
+        if left or right:
+            emit_column(left, out)
+            if out and right:
+                out.append('')
+            emit_column(right, out)
+
+    for bucket in buckets:
+        for block_id, words in bucket:
+            parts = split_line(words, gutter) if gutter is not None else None
+            if parts is None:
+                if gutter is None:
+                    left.append((block_id, ' '.join(w[4] for w in words)))
+                    continue
+                # Full-width line (title, table row): close both columns first
+                flush()
+                out.append(' '.join(w[4] for w in words))
+                out.append('')
+                continue
+            left_words, right_words = parts
+            if left_words:
+                left.append((block_id, ' '.join(w[4] for w in left_words)))
+            if right_words:
+                right.append((block_id, ' '.join(w[4] for w in right_words)))
+    flush()
+    return '\n'.join(out)
+
+def reading_order_text(xhtml):
+    """Whole document in reading order; pages are separated by form feeds like pdftotext"""
+    return '\f'.join(page_text(width, height, lines) for width, height, lines in parse_pages(xhtml)) + '\f'
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Generate resized WebP and PNG derivatives of the extracted figures
+
+For every images/*.png this writes thumbnail, modal and full-size variants
+to images/derivatives/ and records width, height and bytes of each one in
+images/derivatives/manifest.json. A PNG is only written for variants that
+are actually downscaled: otherwise the original images/*.png is the PNG
+fallback and the manifest has no 'png' entry for that variant. Sources
+whose SHA-256 has not changed since the last run are skipped.
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+IMAGES_DIR = "images"
+DERIVATIVES_DIR = os.path.join(IMAGES_DIR, "derivatives")
+MANIFEST_PATH = os.path.join(DERIVATIVES_DIR, "manifest.json")
+
+# Target widths in pixels; None keeps the original size
+VARIANTS = {
+    'thumb': 240,
+    'modal': 640,
+    'full': None,
+}
+FORMATS = ('webp', 'png')
+WEBP_QUALITY = 82
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest():
+    """Previous derivative manifest, keyed by source image name"""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, 'r') as f:
+        return json.load(f)
+
+def is_cached(record, source_hash):
+    """True when the variants on disk were made from this exact source"""
+    if not record or record.get('sha256') != source_hash:
+        return False
+    # Older runs also wrote a full-size PNG copy; regenerate without it
+    if 'png' in record['variants'].get('full', {}):
+        return False
+    return all(
+        os.path.exists(os.path.join(DERIVATIVES_DIR, fmt_info['file']))
+        for variant in record['variants'].values()
+        for fmt_info in variant.values()
+    )
+
+def normalize_mode(image):
+    """Convert palette/CMYK/16-bit images to RGB(A) so they can be resampled"""
+    if image.mode in ('RGB', 'RGBA', 'L'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+def resize_to_width(image, width):
+    """Downscale to the target width keeping the aspect ratio (never upscale)"""
+    if width is None or image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+def render_variants(image_name):
+    """Write every variant of one source image; runs in a worker process"""
+    stem = os.path.splitext(image_name)[0]
+    variants = {}
+    with Image.open(os.path.join(IMAGES_DIR, image_name)) as source:
+        source = normalize_mode(source)
+        for variant, width in VARIANTS.items():
+            resized = resize_to_width(source, width)
+            variants[variant] = {}
+            for fmt in FORMATS:
+                if fmt == 'png' and resized is source:
+                    continue  # same pixels as the original PNG
+                file_name = f"{stem}-{variant}.{fmt}"
+                path = os.path.join(DERIVATIVES_DIR, file_name)
+                if fmt == 'webp':
+                    resized.save(path, 'WEBP', quality=WEBP_QUALITY, method=6)
+                else:
+                    resized.save(path, 'PNG', optimize=True)
+                variants[variant][fmt] = {
+                    'file': file_name,
+                    'width': resized.width,
+                    'height': resized.height,
+                    'bytes': os.path.getsize(path),
+                }
+    return variants
+
+def process_image(image_name):
+    """Worker entry point: (image_name, variants, error)"""
+    try:
+        return image_name, render_variants(image_name), None
+    except (OSError, ValueError) as e:
+        return image_name, None, str(e)
+
+def variant_files(record):
+    """File names of every variant in a manifest record"""
+    return {
+        fmt_info['file']
+        for variant in record.get('variants', {}).values()
+        for fmt_info in variant.values()
+    }
+
+def remove_stale_variants(previous, manifest):
+    """Delete variants of source images that no longer exist, or that a re-run no longer writes"""
+    for image_name, record in previous.items():
+        current = variant_files(manifest.get(image_name, {}))
+        for file_name in variant_files(record) - current:
+            path = os.path.join(DERIVATIVES_DIR, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='regenerate all variants even if the source is unchanged')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(DERIVATIVES_DIR, exist_ok=True)
+
+    previous = load_manifest()
+    sources = sorted(f for f in os.listdir(IMAGES_DIR) if f.endswith('.png'))
+
+    manifest = {}
+    pending = []
+    for image_name in sources:
+        source_hash = file_sha256(os.path.join(IMAGES_DIR, image_name))
+        record = previous.get(image_name)
+        if not args.force and is_cached(record, source_hash):
+            manifest[image_name] = record
+        else:
+            manifest[image_name] = {'sha256': source_hash}
+            pending.append(image_name)
+
+    print(f"🖼️  {len(sources)} images, {len(pending)} to process with {args.workers} workers")
+
+    failed = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for image_name, variants, error in executor.map(process_image, pending, chunksize=8):
+                if error:
+                    print(f"  ⚠️  {image_name}: {error}")
+                    failed.append(image_name)
+                    del manifest[image_name]
+                else:
+                    manifest[image_name]['variants'] = variants
+
+    remove_stale_variants(previous, manifest)
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Size report
+    source_bytes = sum(os.path.getsize(os.path.join(IMAGES_DIR, name)) for name in manifest)
+    print()
+    print(f"📊 Source PNGs: {source_bytes / 1e6:.1f} MB")
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            total = sum(r['variants'][variant].get(fmt, {}).get('bytes', 0) for r in manifest.values())
+            print(f"   {variant:6} {fmt:5}: {total / 1e6:7.1f} MB")
+    if failed:
+        print(f"⚠️  {len(failed)} images failed: {', '.join(failed[:5])}")
+    print(f"\n✓ Manifest saved to {MANIFEST_PATH}")
+
+if __name__ == '__main__':
+    main()
@@ -1,100 +1,60 @@
 #!/usr/bin/env python3
 """
 Create term-image mapping by analyzing image captions for term matches
+
+With --ndjson every caption match is written to term_image_matches.ndjson
+as soon as it is found, instead of being grouped into the JSON mappings;
+--terms also accepts an NDJSON term file (e.g. from
+`extract_terms_correct.py --ndjson`), read as a stream.
+
+--scoring tfidf replaces the exact/partial/fuzzy rules with TF-IDF cosine
+similarity of each term (name and definition) against every caption
+(tfidf_scoring.py, requires numpy and scipy): each term keeps its best
+captions, and the confidence means the same in every document.
 """
+import argparse
 import json
 import os
-import re
-from pathlib import Path
 from collections import defaultdict
-from difflib import SequenceMatcher
+
+from caption_matcher import MIN_SIMILARITY, build_term_index, match_caption
+from figure_index import load_figure_index, figure_images
+from image_index import figure_files, load_image_index, similar_files
+from ndjson_io import iter_records, write_ndjson
 
 DATA_DIR = "data"
 OUTPUT_DIR = "data/organized"
 
-def normalize_term(term):
-    """Normalize term for better matching"""
-    # Convert to lowercase and remove punctuation
-    normalized = term.lower()
-    normalized = re.sub(r'[^\w\s]', ' ', normalized)
-    normalized = ' '.join(normalized.split())
-    return normalized
+def extract_terms_from_caption(caption, term_list, min_similarity=MIN_SIMILARITY):
+    """Extract terms that appear in a caption (builds a one-off term index; see caption_matcher.py)"""
+    return match_caption(build_term_index(term_list, min_similarity), caption)
 
-def similarity(a, b):
-    """Calculate similarity between two strings"""
-    return SequenceMatcher(None, a, b).ratio()
+def rule_matcher(term_names):
+    """find_terms(document, figure, caption) of the exact/partial/fuzzy rules"""
+    # Terms are normalized and indexed once for all captions
+    term_index = build_term_index(term_names)
+    return lambda doc_name, fig_num, caption: match_caption(term_index, caption)
 
-def extract_terms_from_caption(caption, term_list, min_similarity=0.8):
-    """Extract terms that appear in a caption"""
-    caption_normalized = normalize_term(caption)
-    found_terms = []
-    
-    for term in term_list:
-        term_normalized = normalize_term(term)
-        
-        # Exact match
-        if term_normalized in caption_normalized:
-            found_terms.append({
-                'term': term,
-                'match_type': 'exact',
-                'confidence': 1.0
-            })
-            continue
-        
-        # Partial word match
-        term_words = term_normalized.split()
-        caption_words = caption_normalized.split()
-        
-        # Check if all words of the term appear in the caption
-        if len(term_words) > 1:
-            matches = 0
-            for word in term_words:
-                if len(word) > 2 and word in caption_words:
-                    matches += 1
-            
-            if matches >= len(term_words) * 0.7:  # 70% of words match
-                confidence = matches / len(term_words)
-                found_terms.append({
-                    'term': term,
-                    'match_type': 'partial',
-                    'confidence': confidence
-                })
-                continue
-        
-        # Fuzzy match for longer terms
-        if len(term_normalized) > 8:
-            sim = similarity(term_normalized, caption_normalized)
-            if sim >= min_similarity:
-                found_terms.append({
-                    'term': term,
-                    'match_type': 'fuzzy',
-                    'confidence': sim
-                })
-    
-    return found_terms
+def tfidf_matcher(terms, captions_data):
+    """find_terms(document, figure, caption) of the TF-IDF scores, computed up front for all pairs"""
+    from tfidf_scoring import similarity_matrix, top_matches
 
-def create_term_image_mapping():
-    """Create mapping between terms and images based on captions"""
-    
-    # Load terms
-    terms_file = os.path.join(OUTPUT_DIR, 'morphology_terms.json')
-    with open(terms_file, 'r', encoding='utf-8') as f:
-        terms_data = json.load(f)
-    
-    # Extract term names
-    term_names = [term['term'] for term in terms_data]
-    
-    # Load captions
-    captions_file = os.path.join(OUTPUT_DIR, 'figure_captions.json')
-    with open(captions_file, 'r', encoding='utf-8') as f:
-        captions_data = json.load(f)
-    
-    term_image_mapping = defaultdict(list)
-    image_term_mapping = defaultdict(list)
-    
-    total_matches = 0
-    document_stats = {}
-    
+    keys = [(doc_name, fig_num) for doc_name, doc_captions in captions_data.items() for fig_num in doc_captions]
+    scores = similarity_matrix([term['term'] for term in terms],
+                               [term.get('definition') for term in terms],
+                               [captions_data[doc_name][fig_num] for doc_name, fig_num in keys])
+    # Pairs come by term row, so each caption lists its terms in term-list order like the rules
+    found = defaultdict(list)
+    for row, column, score in zip(*top_matches(scores)):
+        found[keys[column]].append({
+            'term': terms[row]['term'],
+            'match_type': 'tfidf',
+            'confidence': round(float(score), 4)
+        })
+    return lambda doc_name, fig_num, caption: found.get((doc_name, fig_num), [])
+
+def caption_matches(captions_data, find_terms, figure_index, image_index):
+    """Match records (term, figure, caption, confidence, match type, document, images), as found"""
     print("🔍 Analyzing captions for term matches...\n")
     
     for doc_name, doc_captions in captions_data.items():
@@ -103,75 +63,105 @@ def create_term_image_mapping():
         
         for fig_num, caption in doc_captions.items():
             # Find terms in this caption
-            found_terms = extract_terms_from_caption(caption, term_names)
+            found_terms = find_terms(doc_name, fig_num, caption)
             
             if found_terms:
                 # Determine image file names based on document and figure number
                 doc_clean = doc_name.replace('.txt', '')
                 
-                # Look for actual image files
-                image_candidates = []
-                
-                # Try different naming patterns
-                patterns = [
-                    f"images/{doc_clean}-{fig_num.zfill(3)}.png",
-                    f"images/{doc_clean}-{fig_num.zfill(2)}.png", 
-                    f"images/{doc_clean}_{fig_num.zfill(3)}.png",
-                    f"images/{doc_clean}_{fig_num.zfill(2)}.png",
-                    f"images/{doc_clean}-{fig_num}.png",
-                    f"images/{doc_clean}_{fig_num}.png"
-                ]
+                # Look up the images on the caption's page
+                image_candidates = figure_images(figure_index, doc_clean, fig_num)
                 
-                # Find existing images
-                for pattern in patterns:
-                    if os.path.exists(pattern):
-                        image_candidates.append(os.path.basename(pattern))
+                # Without a figure index, use the images numbered like the figure
+                if not image_candidates:
+                    image_candidates = figure_files(image_index, doc_clean, fig_num)
                 
                 # If no exact match, try to find similar files
                 if not image_candidates:
-                    try:
-                        images_dir = Path("images")
-                        for img_file in images_dir.glob(f"{doc_clean}*"):
-                            if fig_num in str(img_file):
-                                image_candidates.append(img_file.name)
-                    except:
-                        pass
+                    image_candidates = similar_files(image_index, doc_clean, fig_num)
                 
                 for term_match in found_terms:
-                    term = term_match['term']
-                    confidence = term_match['confidence']
-                    match_type = term_match['match_type']
-                    
-                    # Add to mappings
-                    mapping_entry = {
+                    match = {
+                        'term': term_match['term'],
                         'figure': int(fig_num) if fig_num.isdigit() else fig_num,
                         'caption': caption,
-                        'confidence': confidence,
-                        'match_type': match_type,
+                        'confidence': term_match['confidence'],
+                        'match_type': term_match['match_type'],
                         'document': doc_name,
                         'images': image_candidates
                     }
-                    
-                    term_image_mapping[term].append(mapping_entry)
-                    
-                    for img in image_candidates:
-                        image_term_mapping[img].append({
-                            'term': term,
-                            'confidence': confidence,
-                            'match_type': match_type,
-                            'figure': int(fig_num) if fig_num.isdigit() else fig_num,
-                            'caption': caption
-                        })
-                    
+                    # Exact and fuzzy matches: [start, end) of each occurrence in the caption
+                    if 'caption_spans' in term_match:
+                        match['caption_spans'] = term_match['caption_spans']
+                    yield match
                     doc_matches += 1
-                    total_matches += 1
                     
-                    print(f"   ✓ Fig.{fig_num}: {term} ({match_type}, {confidence:.2f})")
+                    print(f"   ✓ Fig.{fig_num}: {term_match['term']} "
+                          f"({term_match['match_type']}, {term_match['confidence']:.2f})")
         
-        document_stats[doc_name] = doc_matches
         if doc_matches == 0:
             print("   ⚠️  No term matches found")
         print()
+
+def create_term_image_mapping(terms_file=None, ndjson=False, follow=False, scoring='rules'):
+    """Create mapping between terms and images based on captions"""
+    
+    # Load captions
+    captions_file = os.path.join(OUTPUT_DIR, 'figure_captions.json')
+    with open(captions_file, 'r', encoding='utf-8') as f:
+        captions_data = json.load(f)
+    
+    # Load terms (a JSON list or an NDJSON stream)
+    terms_file = terms_file or os.path.join(OUTPUT_DIR, 'morphology_terms.json')
+    if scoring == 'tfidf':
+        # Definitions are part of a term's vector
+        find_terms = tfidf_matcher([{'term': term['term'], 'definition': term.get('definition')}
+                                    for term in iter_records(terms_file, follow)], captions_data)
+    else:
+        find_terms = rule_matcher([term['term'] for term in iter_records(terms_file, follow)])
+    
+    # Page-based figure -> image table from extract_pdfs.py
+    figure_index = load_figure_index()
+    # images/ listed once (or the saved data/image_index.json) for the file name fallbacks
+    image_index = load_image_index()
+    matches = caption_matches(captions_data, find_terms, figure_index, image_index)
+    
+    if ndjson:
+        matches_file = os.path.join(OUTPUT_DIR, 'term_image_matches.ndjson')
+        total_matches = write_ndjson(matches, matches_file)
+        print("=" * 70)
+        print("✅ TERM-IMAGE MATCHES WRITTEN")
+        print("=" * 70)
+        print(f"   • Total term-image matches: {total_matches}")
+        print(f"   • {matches_file}")
+        print()
+        return None
+    
+    term_image_mapping = defaultdict(list)
+    image_term_mapping = defaultdict(list)
+    
+    total_matches = 0
+    
+    for match in matches:
+        term = match['term']
+        
+        # Add to mappings
+        mapping_entry = {key: match[key] for key in
+                         ('figure', 'caption', 'caption_spans', 'confidence', 'match_type', 'document', 'images')
+                         if key in match}
+        term_image_mapping[term].append(mapping_entry)
+        
+        for img in match['images']:
+            image_term_mapping[img].append({
+                'term': term,
+                'confidence': match['confidence'],
+                'match_type': match['match_type'],
+                'figure': match['figure'],
+                'caption': match['caption'],
+                **({'caption_spans': match['caption_spans']} if 'caption_spans' in match else {})
+            })
+        
+        total_matches += 1
     
     # Save mappings
     term_mapping_file = os.path.join(OUTPUT_DIR, 'term_image_mapping.json')
@@ -188,12 +178,15 @@ def create_term_image_mapping():
         web_mapping[term] = []
         for mapping in mappings:
             for img in mapping['images']:
-                web_mapping[term].append({
+                entry = {
                     'image': img,
                     'figure': mapping['figure'],
                     'caption': mapping['caption'][:200] + '...' if len(mapping['caption']) > 200 else mapping['caption'],
                     'confidence': mapping['confidence']
-                })
+                }
+                if 'caption_spans' in mapping:
+                    entry['caption_spans'] = [span for span in mapping['caption_spans'] if span[1] <= 200]
+                web_mapping[term].append(entry)
     
     web_file = os.path.join(OUTPUT_DIR, 'term_images_with_captions.json')
     with open(web_file, 'w', encoding='utf-8') as f:
@@ -207,7 +200,7 @@ def create_term_image_mapping():
     print(f"   • Total term-image matches: {total_matches}")
     print(f"   • Terms with images: {len(term_image_mapping)}")
     print(f"   • Images with terms: {len(image_term_mapping)}")
-    print(f"   • Documents processed: {len(document_stats)}")
+    print(f"   • Documents processed: {len(captions_data)}")
     print()
     
     print("📂 Files generated:")
@@ -229,5 +222,19 @@ def create_term_image_mapping():
     
     return dict(term_image_mapping), dict(image_term_mapping)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terms', help='term file, .json or .ndjson (default: data/organized/morphology_terms.json)')
+    parser.add_argument('--follow', action='store_true',
+                        help='keep reading an .ndjson term file while its producer is still writing it')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='stream match records to term_image_matches.ndjson instead of the JSON mappings')
+    parser.add_argument('--scoring', choices=('rules', 'tfidf'), default='rules',
+                        help='caption matching: exact/partial/fuzzy rules, or TF-IDF similarity '
+                             '(requires numpy and scipy; default: rules)')
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    create_term_image_mapping()
\ No newline at end of file
+    args = parse_args()
+    create_term_image_mapping(args.terms, args.ndjson, args.follow, args.scoring)
\ No newline at end of file
@@ -10,6 +10,10 @@ from pathlib import Path
 from collections import defaultdict
 import unicodedata
 
+from document_model import load_document, document_captions
+from figure_index import load_figure_index, figure_images
+from image_index import figure_files, load_image_index
+
 DATA_DIR = "data"
 OUTPUT_DIR = "data/organized"
 
@@ -41,35 +45,6 @@ def extract_term_components(term):
     
     return components
 
-def extract_figure_captions(text):
-    """Extract figure captions from text"""
-    captions = {}
-    
-    # Pattern for figure captions: "FIG. X. Caption text"
-    pattern = r'FIG\.?\s+(\d+[a-z]?)\.?\s+(.+?)(?=\n\s*FIG\.|\n\n|\Z)'
-    
-    matches = re.finditer(pattern, text, re.IGNORECASE | re.DOTALL)
-    
-    for match in matches:
-        fig_num_str = match.group(1)
-        caption_text = match.group(2).strip()
-        
-        # Clean up caption
-        caption_text = ' '.join(caption_text.split())
-        caption_text = caption_text.replace('\n', ' ')
-        
-        # Extract just the number
-        try:
-            fig_num = int(re.search(r'\d+', fig_num_str).group())
-            # Limit caption length
-            if len(caption_text) > 200:
-                caption_text = caption_text[:197] + '...'
-            captions[fig_num] = caption_text
-        except:
-            pass
-    
-    return captions
-
 def extract_figure_references(text):
     """Extract figure references from text"""
     patterns = [
@@ -138,17 +113,21 @@ def create_enhanced_mapping():
     
     print(f"Loaded {len(terms)} terms")
     
+    # Page-based figure -> image table from extract_pdfs.py
+    figure_index = load_figure_index()
+    # images/ listed once (or the saved data/image_index.json)
+    image_index = load_image_index()
+    
     # Extract all captions
     print("\nExtracting captions from documents...")
     all_captions = {}
     for txt_file in Path(DATA_DIR).glob('*.txt'):
-        with open(txt_file, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
-            captions = extract_figure_captions(text)
-            if captions:
-                base_name = txt_file.stem
-                all_captions[base_name] = captions
-                print(f"✓ {txt_file.name[:50]:50} - {len(captions)} captions")
+        # Captions come from the shared document model (cached by text hash)
+        captions = document_captions(load_document(txt_file))
+        if captions:
+            base_name = txt_file.stem
+            all_captions[base_name] = captions
+            print(f"✓ {txt_file.name[:50]:50} - {len(captions)} captions")
     
     print(f"\nTotal documents with captions: {len(all_captions)}")
     
@@ -187,39 +166,28 @@ def create_enhanced_mapping():
         
         if figure_nums:
             mapping_stats['direct_reference'] += 1
+            doc_captions = all_captions.get(base_name, {})
             
-            # Find matching images
-            if images_catalog.get('by_category'):
-                for cat_key, cat_data in images_catalog['by_category'].items():
-                    # More flexible matching for category keys
-                    if any(part in cat_key for part in base_name.split('_')[:3]) or \
-                       any(part in base_name for part in cat_key.split('_')[:3]):
-                        all_imgs = cat_data.get('all_images', [])
-                        doc_captions = all_captions.get(base_name, {})
-                        
-                        for fig_num in figure_nums:
-                            # Find corresponding image with more flexible matching
-                            img_patterns = [
-                                f"-{fig_num:03d}.png",
-                                f"-{fig_num:02d}.png", 
-                                f"_{fig_num:03d}.png",
-                                f"_{fig_num:02d}.png",
-                                f"-{fig_num}.png"
-                            ]
-                            
-                            for img in all_imgs:
-                                for pattern in img_patterns:
-                                    if pattern in img:
-                                        caption = doc_captions.get(fig_num, f"Fig. {fig_num}")
-                                        matching_data.append({
-                                            'image': img,
-                                            'figure': fig_num,
-                                            'caption': caption,
-                                            'match_type': 'direct_reference'
-                                        })
-                                        break
-                                if matching_data:  # Found match, break outer loop
-                                    break
+            # Look up the images on each figure's caption page
+            for fig_num in figure_nums:
+                for img in figure_images(figure_index, base_name, fig_num):
+                    matching_data.append({
+                        'image': img,
+                        'figure': fig_num,
+                        'caption': doc_captions.get(fig_num, f"Fig. {fig_num}"),
+                        'match_type': 'direct_reference'
+                    })
+            
+            # Without a figure index, use the images numbered like the figures
+            if not matching_data:
+                for fig_num in figure_nums:
+                    for img in figure_files(image_index, base_name, fig_num):
+                        matching_data.append({
+                            'image': img,
+                            'figure': fig_num,
+                            'caption': doc_captions.get(fig_num, f"Fig. {fig_num}"),
+                            'match_type': 'direct_reference'
+                        })
         
         # Method 2: Search in captions for term matches
         if not matching_data:
@@ -228,36 +196,19 @@ def create_enhanced_mapping():
             for fig_num, caption in doc_captions.items():
                 if match_term_in_caption(term_components, caption):
                     
-                    # Find corresponding image
-                    if images_catalog.get('by_category'):
-                        for cat_key, cat_data in images_catalog['by_category'].items():
-                            if any(part in cat_key for part in base_name.split('_')[:3]) or \
-                               any(part in base_name for part in cat_key.split('_')[:3]):
-                                all_imgs = cat_data.get('all_images', [])
-                                
-                                img_patterns = [
-                                    f"-{fig_num:03d}.png",
-                                    f"-{fig_num:02d}.png",
-                                    f"_{fig_num:03d}.png", 
-                                    f"_{fig_num:02d}.png",
-                                    f"-{fig_num}.png"
-                                ]
-                                
-                                for img in all_imgs:
-                                    for pattern in img_patterns:
-                                        if pattern in img:
-                                            matching_data.append({
-                                                'image': img,
-                                                'figure': fig_num,
-                                                'caption': caption,
-                                                'match_type': 'caption_match'
-                                            })
-                                            mapping_stats['caption_match'] += 1
-                                            break
-                                    if matching_data:
-                                        break
-                                if matching_data:
-                                    break
+                    # Look up the images on the caption's page; without a
+                    # figure index, the images numbered like the figure
+                    page_images = (figure_images(figure_index, base_name, fig_num)
+                                   or figure_files(image_index, base_name, fig_num))
+                    for img in page_images:
+                        matching_data.append({
+                            'image': img,
+                            'figure': fig_num,
+                            'caption': caption,
+                            'match_type': 'caption_match'
+                        })
+                    if page_images:
+                        mapping_stats['caption_match'] += 1
         
         # Method 3: Fallback - general document images (limited)
         if not matching_data:
@@ -8,6 +8,9 @@ import re
 from pathlib import Path
 from collections import defaultdict
 
+from figure_index import load_figure_index, figure_images
+from image_index import figure_files, load_image_index
+
 DATA_DIR = "data"
 OUTPUT_DIR = "data/organized"
 
@@ -59,9 +62,10 @@ def create_term_image_mapping():
     with open(f"{OUTPUT_DIR}/morphology_terms.json", 'r') as f:
         terms = json.load(f)
     
-    # Load images catalog
-    with open(f"{OUTPUT_DIR}/images_catalog.json", 'r') as f:
-        images_catalog = json.load(f)
+    # Page-based figure -> image table from extract_pdfs.py
+    figure_index = load_figure_index()
+    # images/ listed once (or the saved data/image_index.json)
+    image_index = load_image_index()
     
     term_image_map = {}
     
@@ -81,23 +85,14 @@ def create_term_image_mapping():
             # Find matching images based on source file
             base_name = source.replace('.txt', '').replace('data/', '')
             
-            # Look for images in catalog
-            matching_images = []
+            # Look up the images on each figure's caption page
+            matching_images = [img for fig_num in figure_nums
+                               for img in figure_images(figure_index, base_name, fig_num)]
             
-            if images_catalog.get('by_category'):
-                for cat_key, cat_data in images_catalog['by_category'].items():
-                    # Match by source file name
-                    if base_name in cat_key or cat_key in base_name:
-                        all_imgs = cat_data.get('all_images', [])
-                        
-                        # Map figure numbers to image indices
-                        for fig_num in figure_nums:
-                            # Figures usually map to image indices (Fig. 1 -> image-000.png, etc.)
-                            # Try exact match first
-                            img_index = f"-{fig_num:03d}.png"
-                            for img in all_imgs:
-                                if img_index in img or f"-{fig_num:02d}.png" in img:
-                                    matching_images.append(img)
+            # Without a figure index, use the images numbered like the figures
+            if not matching_images:
+                matching_images = [img for fig_num in figure_nums
+                                   for img in figure_files(image_index, base_name, fig_num)]
             
             if matching_images:
                 term_image_map[term_name] = {
@@ -8,39 +8,13 @@ import re
 from pathlib import Path
 from collections import defaultdict
 
+from document_model import load_document, document_captions, document_caption_spans
+from figure_index import load_figure_index, figure_images
+from image_index import figure_files, load_image_index
+
 DATA_DIR = "data"
 OUTPUT_DIR = "data/organized"
 
-def extract_figure_captions(text):
-    """Extract figure captions from text"""
-    captions = {}
-    
-    # Pattern for figure captions: "FIG. X. Caption text"
-    # This captures multi-line captions too
-    pattern = r'FIG\.?\s+(\d+[a-z]?)\.?\s+(.+?)(?=\n\s*FIG\.|\n\n|\Z)'
-    
-    matches = re.finditer(pattern, text, re.IGNORECASE | re.DOTALL)
-    
-    for match in matches:
-        fig_num_str = match.group(1)
-        caption_text = match.group(2).strip()
-        
-        # Clean up caption
-        caption_text = ' '.join(caption_text.split())
-        caption_text = caption_text.replace('\n', ' ')
-        
-        # Extract just the number
-        try:
-            fig_num = int(re.search(r'\d+', fig_num_str).group())
-            # Limit caption length
-            if len(caption_text) > 200:
-                caption_text = caption_text[:197] + '...'
-            captions[fig_num] = caption_text
-        except:
-            pass
-    
-    return captions
-
 def extract_figure_references(text):
     """Extract figure references from text (Fig. X, Figure X, etc.)"""
     patterns = [
@@ -88,9 +62,10 @@ def create_term_image_mapping_with_captions():
     with open(f"{OUTPUT_DIR}/morphology_terms.json", 'r') as f:
         terms = json.load(f)
     
-    # Load images catalog
-    with open(f"{OUTPUT_DIR}/images_catalog.json", 'r') as f:
-        images_catalog = json.load(f)
+    # Page-based figure -> image table from extract_pdfs.py
+    figure_index = load_figure_index()
+    # images/ listed once (or the saved data/image_index.json)
+    image_index = load_image_index()
     
     term_image_map = {}
     
@@ -99,14 +74,16 @@ def create_term_image_mapping_with_captions():
     print()
     
     all_captions = {}
+    caption_spans = {}
     for txt_file in Path(DATA_DIR).glob('*.txt'):
-        with open(txt_file, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
-            captions = extract_figure_captions(text)
-            if captions:
-                base_name = txt_file.stem
-                all_captions[base_name] = captions
-                print(f"✓ {txt_file.name[:60]:60} - {len(captions)} captions")
+        # Captions come from the shared document model (cached by text hash)
+        document = load_document(txt_file)
+        captions = document_captions(document)
+        if captions:
+            base_name = txt_file.stem
+            all_captions[base_name] = captions
+            caption_spans[base_name] = document_caption_spans(document, txt_file.name)
+            print(f"✓ {txt_file.name[:60]:60} - {len(captions)} captions")
     
     print()
     print("Creating term-image-caption mapping...")
@@ -125,26 +102,26 @@ def create_term_image_mapping_with_captions():
             
             # Find matching images and captions
             matching_data = []
+            doc_captions = all_captions.get(base_name, {})
+            
+            # Look up the images on each figure's caption page
+            for fig_num in figure_nums:
+                for img in figure_images(figure_index, base_name, fig_num):
+                    matching_data.append({
+                        'image': img,
+                        'figure': fig_num,
+                        'caption': doc_captions.get(fig_num, f"Fig. {fig_num}")
+                    })
             
-            if images_catalog.get('by_category'):
-                for cat_key, cat_data in images_catalog['by_category'].items():
-                    if base_name in cat_key or cat_key in base_name:
-                        all_imgs = cat_data.get('all_images', [])
-                        
-                        # Get captions for this document
-                        doc_captions = all_captions.get(base_name, {})
-                        
-                        for fig_num in figure_nums:
-                            # Find corresponding image
-                            img_index = f"-{fig_num:03d}.png"
-                            for img in all_imgs:
-                                if img_index in img or f"-{fig_num:02d}.png" in img:
-                                    caption = doc_captions.get(fig_num, f"Fig. {fig_num}")
-                                    matching_data.append({
-                                        'image': img,
-                                        'figure': fig_num,
-                                        'caption': caption
-                                    })
+            # Without a figure index, use the images numbered like the figures
+            if not matching_data:
+                for fig_num in figure_nums:
+                    for img in figure_files(image_index, base_name, fig_num):
+                        matching_data.append({
+                            'image': img,
+                            'figure': fig_num,
+                            'caption': doc_captions.get(fig_num, f"Fig. {fig_num}")
+                        })
             
             if matching_data:
                 term_image_map[term_name] = {
@@ -187,6 +164,13 @@ def create_term_image_mapping_with_captions():
     
     print(f"✓ All captions saved to: {captions_file}")
     
+    # Byte ranges of the captions in data/*.txt (read with source_context.py)
+    spans_file = f"{OUTPUT_DIR}/figure_caption_spans.json"
+    with open(spans_file, 'w', encoding='utf-8') as f:
+        json.dump(caption_spans, f, indent=2, ensure_ascii=False)
+    
+    print(f"✓ Caption source spans saved to: {spans_file}")
+    
     # Statistics
     print(f"\nStatistics:")
     print(f"  Documents with captions: {len(all_captions)}")
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Shared document model for the extracted texts
+
+Every extraction stage used to read data/*.txt on its own and split and
+re-scan it with its own regexes. build_document_model() tokenizes a text
+once: lines with offsets, paragraph blocks, page breaks, figure captions,
+figure references and term blocks. load_document() caches the model in
+data/.document_cache/<sha256>.json, so all stages of a pipeline run (and
+later runs over unchanged texts) share one pass per document.
+
+Offsets in the model are character offsets into the decoded text.
+source_span() turns a character range into the provenance recorded with
+terms and captions: a [start, end) UTF-8 byte range into the source .txt
+file and the page number (pdftotext ends every page with a form feed), so
+source_context.py can seek straight to it. Invalid UTF-8 is dropped from
+the text but still counted in the byte ranges.
+"""
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+
+CACHE_DIR = "data/.document_cache"
+# Bump when the model layout or any detector changes to drop stale caches
+MODEL_VERSION = 3
+
+# Figure caption: "FIG. X. Caption text", up to the next caption, a blank line or the end
+CAPTION_PATTERN = re.compile(r'FIG\.?\s+(\d+[a-z]?)\.?\s+(.+?)(?=\n\s*FIG\.|\n\n|\Z)',
+                             re.IGNORECASE | re.DOTALL)
+# Figure reference in running text: "Fig. 3", "Figs. 3-5", "Figure 12", "FIGS 2, 4"
+FIGURE_REFERENCE = re.compile(r'\bFig(?:ure)?s?\.?\s*(\d+[a-z]?(?:\s*[-,]\s*\d+[a-z]?)*)', re.IGNORECASE)
+
+# Documents already loaded in this process, by text hash
+_loaded = {}
+
+def line_offsets(lines):
+    """Start offset of every line"""
+    starts = []
+    offset = 0
+    for line in lines:
+        starts.append(offset)
+        offset += len(line) + 1
+    return starts
+
+def find_paragraphs(lines):
+    """Runs of non-blank lines as [first_line, last_line]"""
+    paragraphs = []
+    first = None
+    for i, line in enumerate(lines):
+        if line.strip():
+            if first is None:
+                first = i
+        elif first is not None:
+            paragraphs.append([first, i - 1])
+            first = None
+    if first is not None:
+        paragraphs.append([first, len(lines) - 1])
+    return paragraphs
+
+def find_captions(text):
+    """Figure captions as [figure, caption, start, end] offsets, in document order"""
+    captions = []
+    for match in CAPTION_PATTERN.finditer(text):
+        # Clean up caption
+        caption_text = ' '.join(match.group(2).strip().split())
+        figure = re.search(r'\d+', match.group(1))
+        if not figure:
+            continue
+        # Limit caption length
+        if len(caption_text) > 200:
+            caption_text = caption_text[:197] + '...'
+        end = match.start(2) + len(match.group(2).rstrip())
+        captions.append([int(figure.group()), caption_text, match.start(), end])
+    return captions
+
+def extract_figure_captions(text):
+    """Extract figure captions from text: figure number -> caption.
+
+    A later caption for the same figure number replaces an earlier one.
+    """
+    return {figure: caption for figure, caption, *_ in find_captions(text)}
+
+def find_figure_references(text, captions):
+    """Figure references as [figure, offset]; caption headings are left out"""
+    caption_starts = {start for _, _, start, _ in captions}
+    references = []
+    for match in FIGURE_REFERENCE.finditer(text):
+        if match.start() in caption_starts:
+            continue
+        numbers = re.findall(r'\d+', match.group(1))
+        if '-' in match.group(1) and len(numbers) == 2 and int(numbers[0]) <= int(numbers[1]):
+            figures = range(int(numbers[0]), int(numbers[1]) + 1)
+        else:
+            figures = [int(n) for n in numbers]
+        references.extend([figure, match.start()] for figure in figures)
+    return references
+
+# A term header is one or more lines made only of these characters
+HEADER_LINE = re.compile(r"[A-Za-z,\s\-()']*")
+DEFINITION_PREFIX = 'Definition:'
+
+def find_term_blocks(text_content, lines=None, line_starts=None):
+    r"""Term blocks as (header_start, header_end, block_start, block_end) offsets.
+
+    Gives the records of the former single regex
+
+        ^([A-Z][A-Za-z,\s\-()']+?)\s*\n+Definition:\s+(.+?)
+        (?=\n\s*(?:[A-Z][A-Za-z,\s\-()']+?\s*\n+Definition:|\Z))
+
+    (MULTILINE | DOTALL), whose lookahead re-ran the header pattern at every
+    character. Lines are classified once (header characters only, blank,
+    "Definition:" line) and a backward pass precomputes, for every line,
+    the next line after which a definition may end, so the forward pass
+    never looks at a line twice.
+
+    A header is the run of header-only lines just above a "Definition:"
+    line, starting at its first line that begins with a capital. A block
+    runs from the first non-blank character after "Definition:" to the
+    first line break followed by another header (or only blank text);
+    Comment: and Synonym lines stay inside the block, as before. When that
+    end does not exist after a whitespace-only "Definition:" line, the block
+    is the single whitespace character the regex backtracked to.
+    """
+    if lines is None:
+        lines = text_content.split('\n')
+    starts = line_starts if line_starts is not None else line_offsets(lines)
+    n = len(lines)
+    header = [HEADER_LINE.fullmatch(line) is not None for line in lines]
+    blank = [not line.strip() for line in lines]
+    definition = [line.startswith(DEFINITION_PREFIX) for line in lines]
+
+    # Backward pass: next non-blank line, next non-header line and next
+    # line whose line break can end a definition block (n = none)
+    next_text = [n] * (n + 1)
+    next_non_header = [n] * (n + 1)
+    next_end = [n] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        next_text[i] = next_text[i + 1] if blank[i] else i
+        next_non_header[i] = next_non_header[i + 1] if header[i] else i
+        if i < n - 1 and block_ends_after(i, lines, starts, next_text, next_non_header, definition):
+            next_end[i] = i
+        else:
+            next_end[i] = next_end[i + 1]
+
+    # Forward pass over the "Definition:" lines
+    blocks = []
+    position = 0  # first line a new block may start on
+    for k in range(1, n):
+        if not definition[k] or not header[k - 1]:
+            continue
+        first = header_run_start(k, header)
+        term_line = next((l for l in range(max(first, position), k) if 'A' <= lines[l][:1] <= 'Z'), None)
+        if term_line is None or starts[k] - starts[term_line] < 3:
+            continue
+
+        rest = lines[k][len(DEFINITION_PREFIX):]
+        if not (rest[:1].isspace() or (not rest and k < n - 1)):
+            continue  # "Definition:" must be followed by whitespace
+        if rest.strip():
+            m = k
+            block_start = starts[k] + len(DEFINITION_PREFIX) + len(rest) - len(rest.lstrip())
+        else:
+            m = next_text[k + 1]
+            block_start = starts[m] + len(lines[m]) - len(lines[m].lstrip()) if m < n else len(text_content)
+        end = next_end[m] if m < n else n
+        if end == n:
+            # The definition text cannot end. The regex then backtracked
+            # into the whitespace before it and matched one character, the
+            # one before its last line break, when a block may end there
+            # (only blank text or a header follows) and "\s+" keeps one
+            tail_start = starts[k] + len(DEFINITION_PREFIX)
+            last_break = text_content.rfind('\n', tail_start, block_start)
+            if last_break - tail_start < 2 or not (m == n or next_end[m - 1] == m - 1):
+                break  # no later block can end either
+            blocks.append((starts[term_line], starts[k], last_break - 1, last_break))
+            if m == n:
+                break
+            position = m
+            continue
+        blocks.append((starts[term_line], starts[k], block_start, starts[end] + len(lines[end])))
+        position = end + 1
+    return blocks
+
+def header_run_start(k, header):
+    """First line of the run of header-only lines ending on line k - 1.
+
+    Runs end at the non-header "Definition:" line, so each line is walked
+    at most once over the whole document.
+    """
+    first = k - 1
+    while first > 0 and header[first - 1]:
+        first -= 1
+    return first
+
+def block_ends_after(i, lines, starts, next_text, next_non_header, definition):
+    """True when a definition block may end at the line break after line i.
+
+    That is the case when only blank text follows, or when the next
+    non-blank character is a capital opening a header run that reaches a
+    "Definition:" line.
+    """
+    j = next_text[i + 1]
+    if j == len(lines):
+        return True
+    k = next_non_header[i + 1]
+    if k == len(lines) or k <= j or not definition[k]:
+        return False
+    indent = len(lines[j]) - len(lines[j].lstrip())
+    return 'A' <= lines[j][indent] <= 'Z' and starts[k] - (starts[j] + indent) >= 3
+
+
+def build_document_model(text):
+    """Tokenize a document once; the result is plain JSON data"""
+    lines = text.split('\n')
+    line_starts = line_offsets(lines)
+    captions = find_captions(text)
+    return {
+        'version': MODEL_VERSION,
+        'sha256': text_sha256(text),
+        'length': len(text),
+        'line_starts': line_starts,
+        'page_breaks': [match.start() for match in re.finditer('\f', text)],
+        'paragraphs': find_paragraphs(lines),
+        'captions': captions,
+        'figure_references': find_figure_references(text, captions),
+        'term_blocks': find_term_blocks(text, lines, line_starts),
+    }
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def cache_path(sha256):
+    return os.path.join(CACHE_DIR, f"{sha256}.json")
+
+def load_cached_model(sha256):
+    """Cached model for a text hash, or None if missing or outdated"""
+    path = cache_path(sha256)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return model if model.get('version') == MODEL_VERSION else None
+
+def save_cached_model(model):
+    """Write the model through a temporary file, so parallel workers never read half a cache entry"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(model['sha256'])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(model, f)
+    os.replace(tmp_path, path)
+
+def document_from_text(text, use_cache=True):
+    """Document for an in-memory text (e.g. pdftotext stdout)"""
+    sha256 = text_sha256(text)
+    if sha256 in _loaded:
+        return _loaded[sha256]
+    model = load_cached_model(sha256) if use_cache else None
+    if model is None:
+        model = build_document_model(text)
+        if use_cache:
+            save_cached_model(model)
+    # The text and its lines are kept in memory only; the cache holds offsets
+    document = dict(model, text=text, lines=text.split('\n'))
+    _loaded[sha256] = document
+    return document
+
+def load_document(text_file, use_cache=True):
+    """Document model of a data/*.txt file, built at most once per text"""
+    with open(text_file, 'rb') as f:
+        raw = f.read()
+    text = raw.decode('utf-8', errors='ignore')
+    document = document_from_text(text, use_cache)
+    if len(text) != len(raw) and len(text.encode('utf-8')) != len(raw):
+        # Invalid UTF-8 was dropped: byte offsets must count it to point into the file
+        document = dict(document, dropped_bytes=dropped_bytes(raw))
+    return document
+
+def dropped_bytes(raw):
+    """Bytes that decoding with errors='ignore' drops, as [character offsets, bytes dropped up to each].
+
+    surrogateescape turns each of the same bytes into one U+DC80-U+DCFF
+    character, so every run of those marks where bytes went missing.
+    """
+    offsets, counts = [], []
+    dropped = 0
+    for run in re.finditer('[\udc80-\udcff]+', raw.decode('utf-8', errors='surrogateescape')):
+        offsets.append(run.start() - dropped)
+        dropped += len(run.group())
+        counts.append(dropped)
+    return [offsets, counts]
+
+def document_captions(document):
+    """figure number -> caption, as extract_figure_captions() returns"""
+    return {figure: caption for figure, caption, *_ in document['captions']}
+
+def document_caption_spans(document, source):
+    """figure number -> {'source', 'span', 'page'} of the caption document_captions() keeps"""
+    return {figure: {'source': source, **source_span(document, start, end)}
+            for figure, _, start, end in document['captions']}
+
+def line_byte_starts(document):
+    """UTF-8 byte offset of every line; computed once per loaded document, not cached"""
+    if 'line_byte_starts' not in document:
+        starts = []
+        offset = 0
+        for line in document['lines']:
+            starts.append(offset)
+            offset += len(line.encode('utf-8')) + 1
+        document['line_byte_starts'] = starts
+    return document['line_byte_starts']
+
+def byte_offset(document, offset):
+    """Byte offset in the source file of a character offset in the document text"""
+    line = bisect_right(document['line_starts'], offset) - 1
+    column = offset - document['line_starts'][line]
+    position = line_byte_starts(document)[line] + len(document['lines'][line][:column].encode('utf-8'))
+    if 'dropped_bytes' in document:
+        offsets, counts = document['dropped_bytes']
+        dropped = bisect_right(offsets, offset)
+        if dropped:
+            position += counts[dropped - 1]
+    return position
+
+def page_number(document, offset):
+    """1-based page of a character offset; None for texts without page breaks"""
+    if not document['page_breaks']:
+        return None
+    # Every form feed before the offset ends one page
+    return bisect_left(document['page_breaks'], offset) + 1
+
+def trimmed_range(text, start, end):
+    """A character range without its leading and trailing whitespace"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def source_span(document, start, end):
+    """Provenance of a character range: {'span': [start byte, end byte], 'page': n}
+
+    Surrounding whitespace is left out of the span; 'page' is only present
+    when the text has page breaks.
+    """
+    start, end = trimmed_range(document['text'], start, end)
+    provenance = {'span': [byte_offset(document, start), byte_offset(document, end)]}
+    page = page_number(document, start)
+    if page is not None:
+        provenance['page'] = page
+    return provenance
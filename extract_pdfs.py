@@ -6,12 +6,36 @@ import os
 import subprocess
 import json
 import re
+import argparse
+import asyncio
+import hashlib
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from column_layout import reading_order_text
+from extraction_telemetry import (run_measured, measure, load_report, build_report,
+                                  save_report, print_summary)
+
 # Directories
 PDF_DIR = "pdfs"
 DATA_DIR = "data"
 IMAGES_DIR = "images"
+MANIFEST_PATH = os.path.join(DATA_DIR, 'extraction_metadata.json')
+FIGURE_INDEX_PATH = os.path.join(DATA_DIR, 'figure_index.json')
+
+# Concurrent extraction defaults
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_TIMEOUT = 300  # seconds per subprocess job
+DEFAULT_RETRIES = 2
+
+# Hex digits of the PDF hash appended to document IDs
+DOC_ID_HASH_LENGTH = 8
+
+# Start of a figure caption block ("FIG. 3.", "Figure 12")
+CAPTION_START = re.compile(r'^FIG(?:URE)?\.?\s*(\d+)', re.IGNORECASE)
 
 # Ensure output directories exist
 Path(DATA_DIR).mkdir(exist_ok=True)
@@ -28,60 +52,514 @@ def sanitize_filename(filename):
     name = re.sub(r'[-\s]+', '_', name)
     return name.lower().strip('_')
 
-def extract_text(pdf_path, output_path):
-    """Extract text from PDF using pdftotext"""
+def text_command(pdf_path, output_path):
+    """Build the pdftotext command line"""
+    return ['pdftotext', '-layout', pdf_path, output_path]
+
+def images_command(pdf_path, output_prefix):
+    """Build the pdfimages command line"""
+    # Extract as PNG format
+    return ['pdfimages', '-png', pdf_path, output_prefix]
+
+def images_list_command(pdf_path):
+    """Build the pdfimages -list command line (page and size of every image)"""
+    return ['pdfimages', '-list', pdf_path]
+
+def bbox_command(pdf_path):
+    """Build the pdftotext -bbox-layout command line, writing XHTML to stdout"""
+    return ['pdftotext', '-bbox-layout', pdf_path, '-']
+
+def parse_images_list(output, image_prefix):
+    """Parse `pdfimages -list` into one record per extracted image.
+
+    Columns: page num type width height color comp bpc enc interp object ID
+    x-ppi y-ppi size ratio. `num` is the number pdfimages puts in the file
+    name, so each row maps to <prefix>-NNN.png.
+    """
+    images = []
+    for line in output.splitlines():
+        cols = line.split()
+        if len(cols) < 14 or not cols[0].isdigit():
+            continue
+        page, num, width, height = int(cols[0]), int(cols[1]), int(cols[3]), int(cols[4])
+        image = {
+            'file': f"{os.path.basename(image_prefix)}-{num:03d}.png",
+            'page': page,
+            'num': num,
+            'type': cols[2],
+            'width': width,
+            'height': height,
+        }
+        try:
+            x_ppi, y_ppi = int(cols[12]), int(cols[13])
+            # Size on the page in points; pdfimages does not report placement
+            image['display_size'] = [round(width * 72 / x_ppi, 1), round(height * 72 / y_ppi, 1)]
+        except (ValueError, ZeroDivisionError):
+            pass
+        images.append(image)
+    return images
+
+def parse_caption_boxes(xhtml):
+    """Find figure captions in `pdftotext -bbox-layout` output.
+
+    A caption is a text block whose first words are "FIG. N"; its page and
+    bounding box (points, top-left origin) are recorded.
+    """
+    captions = []
     try:
-        subprocess.run(['pdftotext', '-layout', pdf_path, output_path], check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error extracting text from {pdf_path}: {e}")
-        return False
+        root = ET.fromstring(xhtml)
+    except ET.ParseError as e:
+        print(f"  ⚠️  Could not parse bbox layout: {e}")
+        return captions
+    for page_number, page in enumerate(root.iterfind('.//{*}page'), 1):
+        for block in page.iterfind('.//{*}block'):
+            words = [word.text or '' for word in block.iterfind('.//{*}word')]
+            match = CAPTION_START.match(' '.join(words[:3]))
+            if match:
+                captions.append({
+                    'figure': int(match.group(1)),
+                    'page': page_number,
+                    'bbox': [round(float(block.get(k, 0)), 1) for k in ('xMin', 'yMin', 'xMax', 'yMax')],
+                })
+    return captions
+
+def build_figure_table(layout):
+    """Join captions to the images on their page: figure number -> images"""
+    images_by_page = defaultdict(list)
+    for image in layout['images']:
+        # Soft masks are extracted as separate files but are not figures
+        if image['type'] == 'image':
+            images_by_page[image['page']].append(image['file'])
+
+    figures = {}
+    for caption in layout['captions']:
+        # First caption block wins; later matches are usually running text
+        figures.setdefault(str(caption['figure']), {
+            'page': caption['page'],
+            'bbox': caption['bbox'],
+            'images': images_by_page.get(caption['page'], []),
+        })
+    return figures
+
+def save_figure_index(entries):
+    """Write figure_index.json: per document, its image table and figure joins"""
+    index = {}
+    for entry in entries:
+        if 'alias_of' in entry or 'layout' not in entry:
+            continue
+        index[entry['document_id']] = {
+            'images': entry['layout']['images'],
+            'captions': entry['layout']['captions'],
+            'figures': build_figure_table(entry['layout']),
+        }
+    with open(FIGURE_INDEX_PATH, 'w') as f:
+        json.dump(index, f, indent=2)
+    return FIGURE_INDEX_PATH
+
+def extract_text(pdf_path, output_path, records):
+    """Extract text from PDF using pdftotext; the job is timed into records"""
+    record, _ = run_measured('text', text_command(pdf_path, output_path))
+    records.append(record)
+    if record['error']:
+        print(f"Error extracting text from {pdf_path}: {record['error']}")
+    return record['exit_status'] == 0
+
+def extract_images(pdf_path, output_prefix, records):
+    """Extract images from PDF using pdfimages; the job is timed into records"""
+    record, _ = run_measured('images', images_command(pdf_path, output_prefix))
+    records.append(record)
+    if record['error']:
+        print(f"Error extracting images from {pdf_path}: {record['error']}")
+    return record['exit_status'] == 0
+
+def extract_layout(pdf_path, image_prefix, records):
+    """Extract image pages/sizes and caption positions.
 
-def extract_images(pdf_path, output_prefix):
-    """Extract images from PDF using pdfimages"""
+    Returns (layout, bbox_xhtml), or (None, None) on failure.
+    """
+    outputs = []
+    for stage, cmd in (('images_list', images_list_command(pdf_path)), ('bbox', bbox_command(pdf_path))):
+        record, stdout = run_measured(stage, cmd, capture=True)
+        records.append(record)
+        if record['error']:
+            print(f"Error extracting layout from {pdf_path}: {record['error']}")
+            return None, None
+        outputs.append(stdout.decode(errors='ignore'))
+    images_list, bbox_layout = outputs
+    layout = {
+        'images': parse_images_list(images_list, image_prefix),
+        'captions': parse_caption_boxes(bbox_layout),
+    }
+    return layout, bbox_layout
+
+def write_reading_order_text(bbox_layout, output_path):
+    """Write single-column reading-order text built from word boxes"""
     try:
-        # Extract as PNG format
-        subprocess.run(['pdfimages', '-png', pdf_path, output_prefix], check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error extracting images from {pdf_path}: {e}")
+        text = reading_order_text(bbox_layout)
+    except (ET.ParseError, TypeError, ValueError) as e:
+        print(f"Error building reading-order text for {output_path}: {e}")
         return False
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+def list_pdf_files():
+    """List source PDFs in deterministic order"""
+    return sorted([f for f in os.listdir(PDF_DIR) if f.endswith('.pdf') and not f.startswith('download')])
+
+def document_id(pdf_file, pdf_sha256):
+    """Stable document ID: readable name plus a prefix of the content hash.
+
+    sanitize_filename() truncates to whatever the PDF filename holds, so
+    several papers share a name (e.g. "..._standard_terminology_for_t");
+    the hash suffix keeps their outputs apart.
+    """
+    return f"{sanitize_filename(pdf_file)}_{pdf_sha256[:DOC_ID_HASH_LENGTH]}"
+
+def build_metadata_entry(pdf_file, pdf_sha256, canonical_file=None):
+    """Describe where the outputs of a PDF are written.
+
+    Byte-identical PDFs share the outputs of their canonical copy and are
+    recorded as aliases of it.
+    """
+    canonical_file = canonical_file or pdf_file
+    doc_id = document_id(canonical_file, pdf_sha256)
+    entry = {
+        'original_filename': pdf_file,
+        'safe_name': sanitize_filename(canonical_file),
+        'document_id': doc_id,
+        'text_file': os.path.join(DATA_DIR, f"{doc_id}.txt"),
+        'image_prefix': os.path.join(IMAGES_DIR, doc_id)
+    }
+    if canonical_file != pdf_file:
+        entry['alias_of'] = canonical_file
+    return entry
+
+def find_canonical_sources(sources):
+    """Map each PDF hash to the file that will be extracted for it.
+
+    Among byte-identical PDFs the one with the longest (least truncated)
+    filename wins, ties broken alphabetically.
+    """
+    canonical = {}
+    for pdf_file, fingerprint in sources:
+        current = canonical.get(fingerprint['pdf_sha256'])
+        if current is None or (-len(pdf_file), pdf_file) < (-len(current), current):
+            canonical[fingerprint['pdf_sha256']] = pdf_file
+    return canonical
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_tool_versions():
+    """Version banner of the poppler tools (None if a tool is missing)"""
+    versions = {}
+    for tool in ('pdftotext', 'pdfimages'):
+        try:
+            result = subprocess.run([tool, '-v'], capture_output=True, text=True)
+        except OSError:
+            versions[tool] = None
+            continue
+        output = (result.stderr or result.stdout).strip()
+        versions[tool] = output.splitlines()[0] if output else None
+    return versions
+
+def load_manifest():
+    """Previous extraction manifest, keyed by PDF filename"""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, 'r') as f:
+        return {item['original_filename']: item for item in json.load(f)}
+
+def fingerprint_source(pdf_file, previous):
+    """Size, mtime and SHA-256 of a source PDF.
+
+    The hash is only recomputed when size or mtime changed, so checking an
+    unchanged corpus costs one stat() per PDF.
+    """
+    pdf_path = os.path.join(PDF_DIR, pdf_file)
+    stat = os.stat(pdf_path)
+    if (previous and previous.get('pdf_sha256')
+            and previous.get('pdf_size') == stat.st_size
+            and previous.get('pdf_mtime_ns') == stat.st_mtime_ns):
+        pdf_sha256 = previous['pdf_sha256']
+    else:
+        pdf_sha256 = file_sha256(pdf_path)
+    return {'pdf_size': stat.st_size, 'pdf_mtime_ns': stat.st_mtime_ns, 'pdf_sha256': pdf_sha256}
+
+def list_outputs(entry):
+    """Files written for a PDF: its text file and its numbered images"""
+    outputs = [entry['text_file']] if os.path.exists(entry['text_file']) else []
+    prefix = os.path.basename(entry['image_prefix'])
+    image_pattern = re.compile(re.escape(prefix) + r'-\d+\.\w+$')
+    image_dir = os.path.dirname(entry['image_prefix'])
+    outputs.extend(sorted(
+        os.path.join(image_dir, f) for f in os.listdir(image_dir) if image_pattern.match(f)
+    ))
+    return outputs
+
+def describe_outputs(entry):
+    """Record path, size and SHA-256 of every output of a PDF"""
+    return [
+        {'path': path, 'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+        for path in list_outputs(entry)
+    ]
+
+def is_up_to_date(entry, previous, tool_versions):
+    """True when the source, the tools and all recorded outputs are unchanged"""
+    if not previous or not previous.get('outputs'):
+        return False
+    if previous.get('pdf_sha256') != entry['pdf_sha256']:
+        return False
+    if previous.get('tool_versions') != tool_versions:
+        return False
+    if 'layout' not in previous:
+        return False
+    if previous.get('text_mode', 'layout') != entry['text_mode']:
+        return False
+    if previous.get('text_file') != entry['text_file'] or previous.get('image_prefix') != entry['image_prefix']:
+        return False
+    for output in previous['outputs']:
+        if not os.path.exists(output['path']) or os.path.getsize(output['path']) != output['size']:
+            return False
+    return True
+
+def remove_stale_outputs(previous_manifest, entries):
+    """Delete previously recorded outputs that no current PDF produces.
+
+    This covers PDFs removed from pdfs/ as well as outputs left behind when
+    a document ID changed. Outputs of PDFs whose extraction failed are kept.
+    """
+    keep = set()
+    for entry in entries:
+        outputs = entry.get('outputs', [])
+        if entry.get('failed'):
+            outputs = previous_manifest.get(entry['original_filename'], {}).get('outputs', [])
+        keep.update(output['path'] for output in outputs)
+
+    removed = 0
+    for previous in previous_manifest.values():
+        for output in previous.get('outputs', []):
+            if output['path'] not in keep and os.path.exists(output['path']):
+                os.remove(output['path'])
+                removed += 1
+    if removed:
+        print(f"  🗑️  Removed {removed} stale output files")
+    return removed
+
+def save_metadata(extracted_data):
+    """Write extraction_metadata.json"""
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(extracted_data, f, indent=2)
+    return MANIFEST_PATH
+
+async def run_job(stage, cmd, semaphore, records, timeout=DEFAULT_TIMEOUT,
+                  retries=DEFAULT_RETRIES, capture=False):
+    """Run one subprocess job inside the worker pool, with timeout and retries.
+
+    Each attempt is timed into records. Returns (ok, stdout); stdout is only
+    collected when capture is set.
+    """
+    for attempt in range(1, retries + 2):
+        async with semaphore:
+            # run_measured blocks until the child exits, so it runs in a thread
+            record, stdout = await asyncio.to_thread(run_measured, stage, cmd, timeout, capture)
+        record['attempt'] = attempt
+        records.append(record)
+        if record['exit_status'] == 0:
+            return True, stdout
+        if record['exit_status'] is None and not record['timed_out']:
+            # Missing binary: retrying will not help
+            print(f"  ✗ {cmd[0]}: {record['error']}")
+            return False, None
+        pdf_name = next((os.path.basename(arg) for arg in cmd if arg.endswith('.pdf')), '')
+        print(f"  ⚠️  {' '.join(cmd[:2])} {pdf_name} (attempt {attempt}/{retries + 1}): {record['error']}")
+    return False, None
+
+async def extract_document_async(entry, semaphore, timeout, retries, records):
+    """Schedule text, image and layout extraction of one PDF as independent jobs"""
+    pdf_path = os.path.join(PDF_DIR, entry['original_filename'])
+    reading_order = entry['text_mode'] == 'reading_order'
+
+    jobs = [
+        run_job('images', images_command(pdf_path, entry['image_prefix']), semaphore, records, timeout, retries),
+        run_job('images_list', images_list_command(pdf_path), semaphore, records, timeout, retries, capture=True),
+        run_job('bbox', bbox_command(pdf_path), semaphore, records, timeout, retries, capture=True),
+    ]
+    # In reading-order mode the text is rebuilt from the bbox output instead
+    if not reading_order:
+        jobs.append(run_job('text', text_command(pdf_path, entry['text_file']), semaphore, records,
+                            timeout, retries))
+    (images_ok, _), (list_ok, images_list), (bbox_ok, bbox_layout), *text_result = await asyncio.gather(*jobs)
+
+    if bbox_ok:
+        bbox_layout = bbox_layout.decode(errors='ignore')
+    if reading_order:
+        text_ok = False
+        if bbox_ok:
+            with measure('reading_order', records):
+                text_ok = write_reading_order_text(bbox_layout, entry['text_file'])
+    else:
+        text_ok = text_result[0][0]
+
+    ok = text_ok and images_ok and list_ok and bbox_ok
+    if ok:
+        entry['layout'] = {
+            'images': parse_images_list(images_list.decode(errors='ignore'), entry['image_prefix']),
+            'captions': parse_caption_boxes(bbox_layout),
+        }
+    print(f"{'✓' if ok else '✗'} {entry['original_filename']}")
+    return ok
+
+async def extract_all_async(entries, telemetry, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                            retries=DEFAULT_RETRIES):
+    """Extract PDFs concurrently, bounded by the number of workers.
+
+    Stage records of each PDF are collected in telemetry[original_filename].
+    """
+    workers = max(1, workers)
+    semaphore = asyncio.Semaphore(workers)
+    # One thread per concurrent job, so no job waits for a thread while timed
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(workers))
+    # gather() keeps the input order, so results line up with entries
+    return await asyncio.gather(*(
+        extract_document_async(entry, semaphore, timeout, retries,
+                               telemetry.setdefault(entry['original_filename'], []))
+        for entry in entries
+    ))
+
+def extract_all_serial(entries, telemetry):
+    """Extract PDFs one at a time"""
+    results = []
+
+    for entry in entries:
+        print(f"\nProcessing: {entry['original_filename']}")
+
+        pdf_path = os.path.join(PDF_DIR, entry['original_filename'])
+        records = telemetry.setdefault(entry['original_filename'], [])
+
+        # Record image pages/sizes and caption positions
+        print("  Extracting layout")
+        layout, bbox_layout = extract_layout(pdf_path, entry['image_prefix'], records)
+        if layout is not None:
+            entry['layout'] = layout
 
-def main():
-    pdf_files = sorted([f for f in os.listdir(PDF_DIR) if f.endswith('.pdf') and not f.startswith('download')])
-    
-    extracted_data = []
-    
-    for pdf_file in pdf_files:
-        print(f"\nProcessing: {pdf_file}")
-        
-        pdf_path = os.path.join(PDF_DIR, pdf_file)
-        safe_name = sanitize_filename(pdf_file)
-        
         # Extract text
-        text_output = os.path.join(DATA_DIR, f"{safe_name}.txt")
-        print(f"  Extracting text to: {text_output}")
-        extract_text(pdf_path, text_output)
-        
+        print(f"  Extracting text to: {entry['text_file']}")
+        if entry['text_mode'] == 'reading_order':
+            text_ok = False
+            if layout is not None:
+                with measure('reading_order', records):
+                    text_ok = write_reading_order_text(bbox_layout, entry['text_file'])
+        else:
+            text_ok = extract_text(pdf_path, entry['text_file'], records)
+
         # Extract images
-        image_prefix = os.path.join(IMAGES_DIR, safe_name)
-        print(f"  Extracting images with prefix: {image_prefix}")
-        extract_images(pdf_path, image_prefix)
-        
-        # Store metadata
-        extracted_data.append({
-            'original_filename': pdf_file,
-            'safe_name': safe_name,
-            'text_file': text_output,
-            'image_prefix': image_prefix
-        })
-    
-    # Save metadata
-    metadata_path = os.path.join(DATA_DIR, 'extraction_metadata.json')
-    with open(metadata_path, 'w') as f:
-        json.dump(extracted_data, f, indent=2)
-    
+        print(f"  Extracting images with prefix: {entry['image_prefix']}")
+        images_ok = extract_images(pdf_path, entry['image_prefix'], records)
+
+        results.append(text_ok and images_ok and layout is not None)
+
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--serial', action='store_true',
+                        help='run pdftotext/pdfimages one PDF at a time')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'concurrent subprocess jobs (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'seconds allowed per job (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'retries for a failed job (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--reading-order', action='store_true',
+                        help='write single-column text rebuilt from word boxes instead of pdftotext -layout')
+    parser.add_argument('--force', action='store_true',
+                        help='re-extract every PDF even if its inputs are unchanged')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    previous_manifest = load_manifest()
+    tool_versions = get_tool_versions()
+
+    # Hash sources first so identical PDFs can be extracted once
+    sources = [
+        (pdf_file, fingerprint_source(pdf_file, previous_manifest.get(pdf_file)))
+        for pdf_file in list_pdf_files()
+    ]
+    canonical = find_canonical_sources(sources)
+
+    # Work out which PDFs actually need extracting
+    entries = []
+    pending = []
+    for pdf_file, fingerprint in sources:
+        entry = build_metadata_entry(pdf_file, fingerprint['pdf_sha256'],
+                                     canonical[fingerprint['pdf_sha256']])
+        entry.update(fingerprint)
+        entry['tool_versions'] = tool_versions
+        entry['text_mode'] = 'reading_order' if args.reading_order else 'layout'
+        entries.append(entry)
+        if 'alias_of' in entry:
+            print(f"  🔗 {pdf_file} is identical to {entry['alias_of']}")
+            continue
+        previous = previous_manifest.get(pdf_file)
+        if not args.force and is_up_to_date(entry, previous, tool_versions):
+            entry['outputs'] = previous['outputs']
+            entry['layout'] = previous['layout']
+        else:
+            pending.append(entry)
+
+    documents = sum(1 for entry in entries if 'alias_of' not in entry)
+    print(f"{documents - len(pending)} PDFs up to date, {len(pending)} to extract")
+
+    telemetry = {}
+    if pending:
+        if args.serial:
+            results = extract_all_serial(pending, telemetry)
+        else:
+            print(f"Extracting {len(pending)} PDFs with {args.workers} workers...")
+            results = asyncio.run(
+                extract_all_async(pending, telemetry, args.workers, args.timeout, args.retries))
+
+        for entry, ok in zip(pending, results):
+            if ok:
+                entry['outputs'] = describe_outputs(entry)
+            else:
+                # No outputs recorded, so the next run retries this PDF
+                entry['outputs'] = []
+                entry['failed'] = True
+
+    remove_stale_outputs(previous_manifest, entries)
+
+    # Save manifest and figure table
+    metadata_path = save_metadata(entries)
+    figure_index_path = save_figure_index(entries)
+
+    # Per-stage timings; an up-to-date run keeps the last report
+    telemetry_path = None
+    if telemetry:
+        run_info = {
+            'mode': 'serial' if args.serial else 'async',
+            'workers': 1 if args.serial else args.workers,
+            'text_mode': 'reading_order' if args.reading_order else 'layout',
+            'tool_versions': tool_versions,
+            'elapsed_s': round(time.perf_counter() - started, 3),
+        }
+        report = build_report(entries, telemetry, run_info, load_report())
+        telemetry_path = save_report(report)
+        print_summary(report)
+
     print(f"\n✓ Extraction complete! Metadata saved to {metadata_path}")
+    print(f"  Figure index: {figure_index_path}")
+    if telemetry_path:
+        print(f"  Telemetry: {telemetry_path}")
     print(f"  Text files: {DATA_DIR}/")
     print(f"  Images: {IMAGES_DIR}/")
 
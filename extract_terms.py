@@ -2,14 +2,18 @@
 """
 Smart extraction handling two-column PDFs
 """
-import json
 import os
 import re
-from pathlib import Path
-from collections import defaultdict
 
-DATA_DIR = "data"
-OUTPUT_DIR = "data/organized"
+from document_model import source_span
+from term_cache import source_version
+from term_extraction import extract_and_save, parse_args
+from term_rules import SMART_TERM_RULES, compile_rules, validate_term, print_rule_stats
+
+TERM_RULES = compile_rules(SMART_TERM_RULES)
+# Cached per-document results are reused only while these sources are unchanged
+EXTRACTOR_VERSION = source_version('extract_terms.py', 'term_extraction.py', 'term_rules.py',
+                                   'document_model.py', 'term_ids.py')
 
 def split_multicolumn_term(text):
     """Split terms that come from two-column PDFs"""
@@ -42,48 +46,17 @@ def clean_definition(definition):
         definition = definition[:797] + '...'
     return definition
 
-def is_valid_term(term):
-    """Check if term is a valid morphological term"""
-    term_lower = term.lower()
-    
-    # Must start with capital letter
-    if not term[0].isupper():
-        return False
-    
-    # Invalid patterns
-    invalid_patterns = [
-        r'^anatomical?\s+variation',
-        r'^all\s+the\s+',
-        r'fig\.',
-        r'table\s+\d',
-        r'http',
-        r'www\.',
-        r'\.com',
-        r'@',
-        r'copyright',
-        r'received\s+\d',
-        r'doi\s*:',
-        r'^\d+\.',
-        r'\n{2,}',
-    ]
-    
-    for pattern in invalid_patterns:
-        if re.search(pattern, term_lower):
-            return False
-    
-    # Length checks
-    if len(term) < 3 or len(term) > 80:
-        return False
-    
-    # Word count check
-    word_count = len(term.split())
-    if word_count > 10:
-        return False
-    
-    return True
+def is_valid_term(term, definition=None):
+    """Check if term (and its definition) pass the shared validation rules"""
+    return validate_term(TERM_RULES, term, definition)
+
+def extract_morphology_terms(text_content, filename, document=None):
+    """Extract morphological terms handling multi-column format.
 
-def extract_morphology_terms(text_content, filename):
-    """Extract morphological terms handling multi-column format"""
+    With the document model, each term records the source span and page
+    of its "Term: Definition" match (both terms of a two-column match
+    share it).
+    """
     terms = []
     
     # Main pattern: "Term: Definition"
@@ -94,6 +67,7 @@ def extract_morphology_terms(text_content, filename):
     for match in matches:
         term_line = match.group(1).strip()
         definition_text = match.group(2).strip()
+        provenance = source_span(document, match.start(), match.end()) if document is not None else {}
         
         # Split if this is a two-column term
         term_names = split_multicolumn_term(term_line)
@@ -108,33 +82,36 @@ def extract_morphology_terms(text_content, filename):
                     term = clean_term(term_name)
                     definition = clean_definition(def_parts[i])
                     
-                    if is_valid_term(term) and len(definition) > 20:
+                    if is_valid_term(term, definition):
                         terms.append({
                             'term': term,
                             'definition': definition,
-                            'source': os.path.basename(filename)
+                            'source': os.path.basename(filename),
+                            **provenance
                         })
             else:
                 # Couldn't split definition, use for first term only
                 term = clean_term(term_names[0])
                 definition = clean_definition(definition_text)
                 
-                if is_valid_term(term) and len(definition) > 20:
+                if is_valid_term(term, definition):
                     terms.append({
                         'term': term,
                         'definition': definition,
-                        'source': os.path.basename(filename)
+                        'source': os.path.basename(filename),
+                        **provenance
                     })
         else:
             # Single term
             term = clean_term(term_line)
             definition = clean_definition(definition_text)
             
-            if is_valid_term(term) and len(definition) > 20:
+            if is_valid_term(term, definition):
                 terms.append({
                     'term': term,
                     'definition': definition,
-                    'source': os.path.basename(filename)
+                    'source': os.path.basename(filename),
+                    **provenance
                 })
     
     return terms
@@ -163,87 +140,39 @@ def categorize_by_topic(filename):
     
     return 'general'
 
+def extract_document(document, filename):
+    """Terms of a document model (term_extraction.py worker)"""
+    return extract_morphology_terms(document['text'], filename, document)
+
+EXTRACTOR = {
+    'module': __name__,
+    'name': 'smart',
+    'version': EXTRACTOR_VERSION,
+    'rules': TERM_RULES,
+    'extract': extract_document,
+    'categorize': categorize_by_topic,
+    'suffix': '',
+}
+
+def report_document(item, terms):
+    filename = os.path.basename(item['text_file'])
+    print(f"📄 {filename[:65]}")
+    
+    if terms:
+        print(f"   ✅ {len(terms)} terms")
+    else:
+        print(f"   ⚠️  No terms")
+
 def main():
-    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-    
-    # Load metadata
-    with open(f"{DATA_DIR}/extraction_metadata.json", 'r') as f:
-        metadata = json.load(f)
-    
-    all_terms = []
-    terms_by_category = defaultdict(list)
+    args = parse_args(__doc__, EXTRACTOR['suffix'])
     
     print("="*70)
     print("🔬 SMART MORPHOLOGICAL TERM EXTRACTION")
     print("="*70)
     print()
     
-    for item in metadata:
-        text_file = item['text_file']
-        
-        if not os.path.exists(text_file):
-            continue
-        
-        filename = os.path.basename(text_file)
-        print(f"📄 {filename[:65]}")
-        
-        # Read text
-        with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-            text_content = f.read()
-        
-        # Extract terms
-        terms = extract_morphology_terms(text_content, text_file)
-        
-        if terms:
-            category = categorize_by_topic(item['original_filename'])
-            
-            for term in terms:
-                term['category'] = category
-                term['document'] = item['original_filename'].replace('.pdf', '')
-                all_terms.append(term)
-                terms_by_category[category].append(term)
-            
-            print(f"   ✅ {len(terms)} terms")
-        else:
-            print(f"   ⚠️  No terms")
-    
-    # Remove duplicates - keep first occurrence
-    seen = set()
-    unique_terms = []
-    for term in all_terms:
-        key = (term['term'].lower().strip(), term['category'])
-        if key not in seen:
-            seen.add(key)
-            unique_terms.append(term)
-    
-    # Sort terms alphabetically by category then term name
-    unique_terms.sort(key=lambda x: (x['category'], x['term'].lower()))
-    
-    # Save all terms
-    terms_file = f"{OUTPUT_DIR}/morphology_terms.json"
-    with open(terms_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_terms, f, indent=2, ensure_ascii=False)
-    
-    # Save terms by category
-    categories_dict = {}
-    for cat in set(t['category'] for t in unique_terms):
-        cat_terms = [t for t in unique_terms if t['category'] == cat]
-        categories_dict[cat] = sorted(cat_terms, key=lambda x: x['term'].lower())
-    
-    categories_file = f"{OUTPUT_DIR}/terms_by_category.json"
-    with open(categories_file, 'w', encoding='utf-8') as f:
-        json.dump(categories_dict, f, indent=2, ensure_ascii=False)
-    
-    # Create index
-    index = {
-        'total_terms': len(unique_terms),
-        'categories': {cat: len(terms) for cat, terms in categories_dict.items()},
-        'sample_terms': [t['term'] for t in unique_terms[:30]]
-    }
-    
-    index_file = f"{OUTPUT_DIR}/terms_index.json"
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
+    summary = extract_and_save(EXTRACTOR, args, report_document)
+    category_counts = summary['category_counts']
     
     print()
     print("="*70)
@@ -251,24 +180,27 @@ def main():
     print("="*70)
     print()
     print(f"📊 Statistics:")
-    print(f"   • Total unique terms: {len(unique_terms)}")
-    print(f"   • Categories: {len(categories_dict)}")
+    print(f"   • Total unique terms: {summary['total_terms']}")
+    print(f"   • Categories: {len(category_counts)}")
+    print(f"   • Documents extracted: {summary['documents'] - summary['cache_hits']} "
+          f"(♻️  {summary['cache_hits']} from cache)")
+    print()
+    print_rule_stats(summary['rule_stats'])
     print()
     print(f"📂 Terms by category:")
-    for cat, terms in sorted(categories_dict.items(), key=lambda x: len(x[1]), reverse=True):
+    for cat, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
         emoji = {'ear': '👂', 'head_face': '👤', 'nose_philtrum': '👃', 
                  'lips_mouth': '👄', 'hands_feet': '✋', 'teeth': '🦷',
                  'periorbital': '👁️', 'genitalia': '🔬', 'general': '📚',
                  'phenotypic_variations': '🧬'}.get(cat, '📝')
-        print(f"   {emoji} {cat:25} : {len(terms):4} terms")
+        print(f"   {emoji} {cat:25} : {count:4} terms")
     print()
     print(f"💾 Files created:")
-    print(f"   • {terms_file}")
-    print(f"   • {categories_file}")
-    print(f"   • {index_file}")
+    for file in summary['files']:
+        print(f"   • {file}")
     print()
     print(f"🔍 Sample terms (first 10):")
-    for i, term in enumerate(unique_terms[:10], 1):
+    for i, term in enumerate(summary['examples'][:10], 1):
         cat_emoji = {'ear': '👂', 'head_face': '👤', 'nose_philtrum': '👃', 
                      'lips_mouth': '👄', 'hands_feet': '✋', 'teeth': '🦷',
                      'periorbital': '👁️', 'genitalia': '🔬'}.get(term['category'], '📝')
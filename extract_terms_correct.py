@@ -2,33 +2,38 @@
 """
 Correct extraction of morphological terms with proper definitions
 """
-import json
 import os
 import re
-from pathlib import Path
-from collections import defaultdict
 
-DATA_DIR = "data"
-OUTPUT_DIR = "data/organized"
+from document_model import find_term_blocks, source_span
+from term_cache import source_version
+from term_extraction import extract_and_save, parse_args
+from term_rules import CORRECTED_TERM_RULES, compile_rules, validate_term, print_rule_stats
 
-def extract_terms_with_definitions(text_content, filename):
-    """Extract terms with their actual definitions"""
+TERM_RULES = compile_rules(CORRECTED_TERM_RULES)
+# Cached per-document results are reused only while these sources are unchanged
+EXTRACTOR_VERSION = source_version('extract_terms_correct.py', 'term_extraction.py', 'term_rules.py',
+                                   'document_model.py', 'term_ids.py')
+
+def extract_terms_with_definitions(text_content, filename, term_blocks=None, document=None):
+    """Extract terms with their actual definitions.
+
+    term_blocks are the block offsets of the document model; they are
+    computed from the text when not given. With the document model, each
+    term records its source span and page (and its comment's as
+    'comment_span'), see document_model.source_span().
+    """
     terms = []
+    if term_blocks is None:
+        term_blocks = find_term_blocks(text_content)
     
-    # Pattern to match:
+    # Term blocks look like:
     # Term Name
     # Definition: Definition text. [objective/subjective]
     #   Comment: Comment text (optional)
-    
-    # First, let's find all term blocks
-    # A term block starts with a capitalized term name and contains "Definition:"
-    pattern = r'^([A-Z][A-Za-z,\s\-()\']+?)\s*\n+Definition:\s+(.+?)(?=\n\s*(?:[A-Z][A-Za-z,\s\-()\']+?\s*\n+Definition:|\Z))'
-    
-    matches = re.finditer(pattern, text_content, re.MULTILINE | re.DOTALL)
-    
-    for match in matches:
-        term_name = match.group(1).strip()
-        definition_block = match.group(2).strip()
+    for header_start, header_end, block_start, block_end in term_blocks:
+        term_name = text_content[header_start:header_end].strip()
+        definition_block = text_content[block_start:block_end].strip()
         
         # Clean term name
         term_name = ' '.join(term_name.split())
@@ -48,31 +53,22 @@ def extract_terms_with_definitions(text_content, filename):
         # Remove objective/subjective markers from end
         definition = re.sub(r'\s+(objective|subjective)\s*$', '', definition, flags=re.IGNORECASE)
         
-        # Validation
-        if (term_name and definition and 
-            len(term_name) < 100 and 
-            len(term_name.split()) <= 15 and
-            len(definition) > 10 and
-            not term_name.startswith('http') and
-            not term_name.startswith('www') and
-            not term_name.startswith('DOI') and
-            not term_name.startswith('Fig') and
-            not term_name.startswith('Table') and
-            'Copyright' not in term_name and
-            'Received' not in term_name and
-            '@' not in term_name and
-            term_name != 'Definition' and
-            term_name != 'Comment' and
-            term_name != 'Synonym'):
+        # Validation (shared rule engine, see term_rules.py)
+        if validate_term(TERM_RULES, term_name, definition):
             
             term_dict = {
                 'term': term_name,
                 'definition': definition[:1500],  # Limit length
                 'source': os.path.basename(filename)
             }
+            if document is not None:
+                term_dict.update(source_span(document, header_start, block_end))
             
             if comment and len(comment) > 10:
                 term_dict['comment'] = comment[:500]
+                if document is not None:
+                    comment_start = text_content.index('Comment:', block_start) + len('Comment:')
+                    term_dict['comment_span'] = source_span(document, comment_start, block_end)['span']
             
             terms.append(term_dict)
     
@@ -102,117 +98,71 @@ def categorize_by_topic(filename):
     
     return 'general'
 
+def extract_document(document, filename):
+    """Terms of a document model (term_extraction.py worker)"""
+    return extract_terms_with_definitions(document['text'], filename, document['term_blocks'], document)
+
+EXTRACTOR = {
+    'module': __name__,
+    'name': 'corrected',
+    'version': EXTRACTOR_VERSION,
+    'rules': TERM_RULES,
+    'extract': extract_document,
+    'categorize': categorize_by_topic,
+    'suffix': '_corrected',
+}
+
+def report_document(item, terms):
+    filename = os.path.basename(item['text_file'])
+    print(f"📄 {filename[:65]}")
+    
+    if terms:
+        print(f"   ✅ {len(terms)} términos extraídos")
+        # Show sample
+        sample = terms[0]
+        print(f"   📝 Ejemplo: {sample['term']}")
+        print(f"      Def: {sample['definition'][:80]}...")
+    else:
+        print(f"   ⚠️  No se encontraron términos")
+    print()
+
 def main():
-    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-    
-    # Load metadata
-    with open(f"{DATA_DIR}/extraction_metadata.json", 'r') as f:
-        metadata = json.load(f)
-    
-    all_terms = []
-    terms_by_category = defaultdict(list)
+    args = parse_args(__doc__, EXTRACTOR['suffix'])
     
     print("="*70)
     print("🔍 EXTRACCIÓN CORRECTA DE TÉRMINOS Y DEFINICIONES")
     print("="*70)
     print()
     
-    for item in metadata:
-        text_file = item['text_file']
-        
-        if not os.path.exists(text_file):
-            continue
-        
-        filename = os.path.basename(text_file)
-        print(f"📄 {filename[:65]}")
-        
-        # Read text
-        with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-            text_content = f.read()
-        
-        # Extract terms
-        terms = extract_terms_with_definitions(text_content, text_file)
-        
-        if terms:
-            category = categorize_by_topic(item['original_filename'])
-            
-            for term in terms:
-                term['category'] = category
-                term['document'] = item['original_filename'].replace('.pdf', '')
-                all_terms.append(term)
-                terms_by_category[category].append(term)
-            
-            print(f"   ✅ {len(terms)} términos extraídos")
-            # Show sample
-            if terms:
-                sample = terms[0]
-                print(f"   📝 Ejemplo: {sample['term']}")
-                print(f"      Def: {sample['definition'][:80]}...")
-        else:
-            print(f"   ⚠️  No se encontraron términos")
-        print()
-    
-    # Remove duplicates
-    seen = set()
-    unique_terms = []
-    for term in all_terms:
-        key = (term['term'].lower().strip(), term['category'])
-        if key not in seen:
-            seen.add(key)
-            unique_terms.append(term)
-    
-    # Sort
-    unique_terms.sort(key=lambda x: (x['category'], x['term'].lower()))
-    
-    # Save all terms
-    terms_file = f"{OUTPUT_DIR}/morphology_terms_corrected.json"
-    with open(terms_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_terms, f, indent=2, ensure_ascii=False)
-    
-    # Save by category
-    categories_dict = {}
-    for cat in set(t['category'] for t in unique_terms):
-        cat_terms = [t for t in unique_terms if t['category'] == cat]
-        categories_dict[cat] = sorted(cat_terms, key=lambda x: x['term'].lower())
-    
-    categories_file = f"{OUTPUT_DIR}/terms_by_category_corrected.json"
-    with open(categories_file, 'w', encoding='utf-8') as f:
-        json.dump(categories_dict, f, indent=2, ensure_ascii=False)
-    
-    # Create index
-    index = {
-        'total_terms': len(unique_terms),
-        'categories': {cat: len(terms) for cat, terms in categories_dict.items()},
-        'sample_terms': [t['term'] for t in unique_terms[:30]]
-    }
-    
-    index_file = f"{OUTPUT_DIR}/terms_index_corrected.json"
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
+    summary = extract_and_save(EXTRACTOR, args, report_document)
+    category_counts = summary['category_counts']
     
     print("="*70)
     print("✅ EXTRACCIÓN COMPLETADA")
     print("="*70)
     print()
     print(f"📊 Estadísticas:")
-    print(f"   • Total términos únicos: {len(unique_terms)}")
-    print(f"   • Categorías: {len(categories_dict)}")
+    print(f"   • Total términos únicos: {summary['total_terms']}")
+    print(f"   • Categorías: {len(category_counts)}")
+    print(f"   • Documentos extraídos: {summary['documents'] - summary['cache_hits']} "
+          f"(♻️  {summary['cache_hits']} desde caché)")
+    print()
+    print_rule_stats(summary['rule_stats'])
     print()
     print(f"📂 Términos por categoría:")
-    for cat, terms in sorted(categories_dict.items(), key=lambda x: len(x[1]), reverse=True):
+    for cat, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
         emoji = {'ear': '👂', 'head_face': '👤', 'nose_philtrum': '👃', 
                  'lips_mouth': '👄', 'hands_feet': '✋', 'teeth': '🦷',
                  'periorbital': '👁️', 'genitalia': '🔬', 'general': '📚',
                  'phenotypic_variations': '🧬', 'introduction': '📖'}.get(cat, '📝')
-        print(f"   {emoji} {cat:25} : {len(terms):4} términos")
+        print(f"   {emoji} {cat:25} : {count:4} términos")
     print()
     print(f"💾 Archivos generados:")
-    print(f"   • {terms_file}")
-    print(f"   • {categories_file}")
-    print(f"   • {index_file}")
+    for file in summary['files']:
+        print(f"   • {file}")
     print()
     print(f"🔍 Ejemplos de términos extraídos:")
-    for i, term in enumerate(unique_terms[:5], 1):
+    for i, term in enumerate(summary['examples'][:5], 1):
         print(f"   {i}. {term['term']}")
         print(f"      → {term['definition'][:100]}...")
         print()
@@ -8,13 +8,16 @@ import re
 from pathlib import Path
 from collections import defaultdict
 
+from document_model import load_document
+
 DATA_DIR = "data"
 OUTPUT_DIR = "data/organized"
 
-def extract_structured_terms(text_content, filename):
+def extract_structured_terms(text_content, filename, lines=None):
     """Extract terms with definitions using various patterns"""
     terms = []
-    lines = text_content.split('\n')
+    if lines is None:
+        lines = text_content.split('\n')
     
     i = 0
     while i < len(lines):
@@ -117,6 +120,10 @@ def main():
     print("Extracting terms from documents...\n")
     
     for item in metadata:
+        # Identical PDFs share one extracted text
+        if item.get('alias_of'):
+            continue
+        
         text_file = item['text_file']
         
         if not os.path.exists(text_file):
@@ -124,12 +131,11 @@ def main():
         
         print(f"Processing: {os.path.basename(text_file)}")
         
-        # Read text
-        with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-            text_content = f.read()
+        # Shared document model (cached by text hash)
+        document = load_document(text_file)
         
         # Extract terms
-        terms = extract_structured_terms(text_content, text_file)
+        terms = extract_structured_terms(document['text'], text_file, document['lines'])
         
         if terms:
             category = categorize_by_topic(item['original_filename'])
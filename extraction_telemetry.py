@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Per-stage telemetry for extract_pdfs.py
+
+Every subprocess job (pdftotext, pdfimages) and in-process stage is timed
+with wall-clock and CPU time; subprocess CPU comes from the child's own
+rusage (os.wait4), so it stays per job even when jobs run concurrently.
+extract_pdfs.py turns the stage records into data/extraction_telemetry.json
+and prints a summary table of the slowest documents.
+"""
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+TELEMETRY_PATH = "data/extraction_telemetry.json"
+# Documents listed in the printed summary table
+SUMMARY_ROWS = 10
+# A document is flagged when its wall time grows by this factor since the last run
+REGRESSION_FACTOR = 1.5
+
+def run_measured(stage, cmd, timeout=None, capture=False):
+    """Run a command and measure it: returns (record, stdout).
+
+    stdout is only collected when capture is set. The record holds stage,
+    command, exit status (None when the command could not start or timed
+    out), wall and CPU seconds, stdout bytes and the error text, if any.
+    """
+    record = {'stage': stage, 'command': cmd[0], 'exit_status': None, 'timed_out': False,
+              'wall_s': 0.0, 'cpu_s': 0.0, 'stdout_bytes': 0, 'error': None}
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                                    stderr=stderr)
+        except OSError as e:
+            record['error'] = str(e)
+            return record, None
+
+        timed_out = threading.Event()
+        def kill():
+            timed_out.set()
+            proc.kill()
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            stdout = proc.stdout.read() if capture else None
+            # Reap the child ourselves to get its resource usage
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+            if proc.stdout:
+                proc.stdout.close()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        record['wall_s'] = round(time.perf_counter() - start, 3)
+        record['cpu_s'] = round(usage.ru_utime + usage.ru_stime, 3)
+        record['stdout_bytes'] = len(stdout) if stdout is not None else 0
+        if timed_out.is_set():
+            record['timed_out'] = True
+            record['error'] = f"timeout after {timeout}s"
+        else:
+            record['exit_status'] = proc.returncode
+            if proc.returncode != 0:
+                stderr.seek(0)
+                record['error'] = (f"exit status {proc.returncode}: "
+                                   f"{stderr.read().decode(errors='ignore').strip()}")
+    return record, stdout
+
+@contextmanager
+def measure(stage, records):
+    """Time an in-process stage (e.g. reading-order rebuild) into records"""
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    record = {'stage': stage, 'command': None, 'exit_status': None, 'timed_out': False, 'error': None}
+    try:
+        yield record
+    finally:
+        record['wall_s'] = round(time.perf_counter() - start_wall, 3)
+        record['cpu_s'] = round(time.thread_time() - start_cpu, 3)
+        records.append(record)
+
+def document_report(entry, stages, previous=None):
+    """Telemetry row for one PDF from its stage records and recorded outputs"""
+    outputs = entry.get('outputs', [])
+    image_outputs = [o for o in outputs if o['path'] != entry['text_file']]
+    row = {
+        'original_filename': entry['original_filename'],
+        'document_id': entry['document_id'],
+        'ok': not entry.get('failed'),
+        'pdf_bytes': entry.get('pdf_size', 0),
+        'text_bytes': sum(o['size'] for o in outputs if o['path'] == entry['text_file']),
+        'image_bytes': sum(o['size'] for o in image_outputs),
+        'images': len(image_outputs),
+        # Sum over stages: concurrent jobs of a document may overlap in time
+        'wall_s': round(sum(s['wall_s'] for s in stages), 3),
+        'cpu_s': round(sum(s['cpu_s'] for s in stages), 3),
+        'jobs': len(stages),
+        'stages': stages,
+    }
+    if previous and previous.get('wall_s'):
+        row['previous_wall_s'] = previous['wall_s']
+    return row
+
+def stage_totals(documents):
+    """Wall/CPU seconds, runs and failures summed per stage"""
+    totals = {}
+    for document in documents:
+        for stage in document['stages']:
+            total = totals.setdefault(stage['stage'], {'runs': 0, 'failures': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            total['runs'] += 1
+            total['failures'] += stage['error'] is not None
+            total['wall_s'] = round(total['wall_s'] + stage['wall_s'], 3)
+            total['cpu_s'] = round(total['cpu_s'] + stage['cpu_s'], 3)
+    return totals
+
+def load_report(path=TELEMETRY_PATH):
+    """Previous telemetry report, or None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def build_report(entries, telemetry, run_info, previous_report=None):
+    """Assemble the run report; telemetry maps PDF filename -> stage records.
+
+    Only PDFs extracted in this run have rows; up-to-date and aliased PDFs
+    are counted in the totals.
+    """
+    previous_rows = {}
+    if previous_report:
+        previous_rows = {row['original_filename']: row for row in previous_report.get('documents', [])}
+    documents = [
+        document_report(entry, telemetry[entry['original_filename']],
+                        previous_rows.get(entry['original_filename']))
+        for entry in entries if entry['original_filename'] in telemetry
+    ]
+    return {
+        'run': run_info,
+        'totals': {
+            'pdfs': len(entries),
+            'extracted': len(documents),
+            'failed': sum(1 for d in documents if not d['ok']),
+            'skipped': len(entries) - len(documents),
+            'pdf_bytes': sum(d['pdf_bytes'] for d in documents),
+            'text_bytes': sum(d['text_bytes'] for d in documents),
+            'image_bytes': sum(d['image_bytes'] for d in documents),
+            'images': sum(d['images'] for d in documents),
+            'wall_s': round(sum(d['wall_s'] for d in documents), 3),
+            'cpu_s': round(sum(d['cpu_s'] for d in documents), 3),
+        },
+        'stages': stage_totals(documents),
+        'documents': documents,
+    }
+
+def save_report(report, path=TELEMETRY_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def stage_seconds(document, *stages):
+    """Wall seconds a document spent in the given stages"""
+    return sum(s['wall_s'] for s in document['stages'] if s['stage'] in stages)
+
+def print_summary(report, rows=SUMMARY_ROWS):
+    """Print per-stage totals and the slowest documents"""
+    documents = report['documents']
+    if not documents:
+        return
+    totals = report['totals']
+    print()
+    print(f"⏱️  {totals['extracted']} PDFs in {report['run']['elapsed_s']:.1f}s "
+          f"(stage wall {totals['wall_s']:.1f}s, CPU {totals['cpu_s']:.1f}s), "
+          f"{totals['pdf_bytes'] / 1e6:.1f} MB in → {(totals['text_bytes'] + totals['image_bytes']) / 1e6:.1f} MB out, "
+          f"{totals['images']} images, {totals['failed']} failed")
+    for stage, total in report['stages'].items():
+        failures = f"  {total['failures']} failed" if total['failures'] else ''
+        print(f"   {stage:13} {total['runs']:4} runs {total['wall_s']:8.1f}s wall "
+              f"{total['cpu_s']:8.1f}s CPU{failures}")
+
+    print()
+    print(f"   {'document':40} {'pdftotext':>9} {'pdfimages':>9} {'CPU':>7} {'MB in':>6} {'MB out':>6} {'imgs':>5}")
+    slowest = sorted(documents, key=lambda d: d['wall_s'], reverse=True)[:rows]
+    for document in slowest:
+        flags = '' if document['ok'] else '  ✗'
+        previous = document.get('previous_wall_s')
+        if previous and document['wall_s'] > REGRESSION_FACTOR * previous:
+            flags += f"  ⚠️ was {previous:.1f}s"
+        # Keep the end of the ID: the common "elements_of_morphology_..." prefix says little
+        name = document['document_id']
+        if len(name) > 40:
+            name = '…' + name[-39:]
+        print(f"   {name:40} "
+              f"{stage_seconds(document, 'text', 'bbox'):8.1f}s "
+              f"{stage_seconds(document, 'images', 'images_list'):8.1f}s "
+              f"{document['cpu_s']:6.1f}s "
+              f"{document['pdf_bytes'] / 1e6:6.1f} "
+              f"{(document['text_bytes'] + document['image_bytes']) / 1e6:6.1f} "
+              f"{document['images']:5}{flags}")
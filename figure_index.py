@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Figure -> image lookup built from the page/position table that
+extract_pdfs.py writes to data/figure_index.json
+"""
+import json
+import os
+
+FIGURE_INDEX_PATH = "data/figure_index.json"
+
+def load_figure_index(path=FIGURE_INDEX_PATH):
+    """Load the figure index, or an empty one if extraction has not produced it"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def figure_images(index, document, figure):
+    """Image files placed on the same page as the caption of a figure.
+
+    `document` is the text file stem (the document ID) and `figure` the
+    figure number, as int or string. Returns [] when the figure is unknown.
+    """
+    document = document.replace('.txt', '')
+    entry = index.get(document, {}).get('figures', {}).get(str(figure))
+    return list(entry['images']) if entry else []
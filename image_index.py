@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+File name index of the images/ directory
+
+Without a figure index (figure_index.py), the mapping scripts found a
+figure's images by probing candidate names (doc-012.png, doc_12.png, ...)
+with os.path.exists and globbing images/ for every matched caption or
+term. build_image_index() lists the directory once instead:
+
+    files       every file name, sorted
+    documents   document stem -> image number (no leading zeros) -> file
+                names, parsed from <stem>-<number>.png / <stem>_<number>.png
+
+so each lookup is a dict read. save_image_index() keeps it in
+data/image_index.json together with the directory's mtime;
+load_image_index() reuses that file while the mtime matches (adding,
+removing or renaming images changes it) and scans the directory otherwise.
+
+Usage:
+    python3 image_index.py          # scan images/ and write data/image_index.json
+"""
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+
+IMAGES_DIR = "images"
+IMAGE_INDEX_PATH = "data/image_index.json"
+
+# <document stem><- or _><image number>.png, as extract_pdfs.py names them
+IMAGE_NAME = re.compile(r'^(?P<document>.+)[-_](?P<number>\d+)\.png$')
+
+def image_number(number):
+    """Key of an image or figure number: '012', '12' and 12 -> '12'"""
+    return str(number).lstrip('0') or '0'
+
+def build_image_index(images_dir=IMAGES_DIR):
+    """Index of the file names in images_dir, from one directory listing (empty if it does not exist)"""
+    try:
+        mtime = os.stat(images_dir).st_mtime_ns
+        with os.scandir(images_dir) as entries:
+            files = sorted(entry.name for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        mtime, files = None, []
+
+    documents = defaultdict(lambda: defaultdict(list))
+    for name in files:
+        match = IMAGE_NAME.match(name)
+        if match:
+            documents[match.group('document')][image_number(match.group('number'))].append(name)
+    return {
+        'directory': images_dir,
+        'mtime': mtime,
+        'files': files,
+        'documents': {document: dict(numbers) for document, numbers in documents.items()},
+    }
+
+def save_image_index(index, path=IMAGE_INDEX_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    return path
+
+def load_image_index(path=IMAGE_INDEX_PATH, images_dir=IMAGES_DIR):
+    """The saved index while it matches images_dir, else a fresh scan"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        try:
+            mtime = os.stat(images_dir).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if index.get('directory') == images_dir and index.get('mtime') == mtime:
+            return index
+    return build_image_index(images_dir)
+
+def figure_files(index, document, figure):
+    """Images of a document numbered like a figure, whatever the zero padding or separator"""
+    document = document.replace('.txt', '')
+    return list(index['documents'].get(document, {}).get(image_number(figure), []))
+
+def similar_files(index, document, figure):
+    """Loose fallback: files whose name starts with the document stem and contains the figure number"""
+    document = document.replace('.txt', '')
+    figure = str(figure)
+    return [name for name in index['files'] if name.startswith(document) and figure in name]
+
+def main():
+    index = build_image_index()
+    if index['mtime'] is None:
+        print(f"❌ No {IMAGES_DIR}/ directory")
+        sys.exit(1)
+    save_image_index(index)
+    numbered = sum(len(names) for numbers in index['documents'].values() for names in numbers.values())
+    print(f"✅ {len(index['files'])} files in {IMAGES_DIR}/, {numbered} numbered images "
+          f"of {len(index['documents'])} documents")
+    print(f"   • {IMAGE_INDEX_PATH}")
+
+if __name__ == '__main__':
+    main()
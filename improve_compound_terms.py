@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 """
 Mejora el algoritmo de asociación términos-imágenes para términos compuestos
+
+Con --scoring tfidf las leyendas de cada término se puntúan por similitud
+TF-IDF (coseno) entre el término, con su definición, y la leyenda, todas
+en un solo producto de matrices dispersas (tfidf_scoring.py, requiere
+numpy y scipy), en lugar de por longitud de componentes.
 """
+import argparse
 import json
 import re
 from collections import defaultdict
 
+from term_ids import build_alias_index, lookup_term_id, record_id
+from term_table import load_table, rows
+
 def normalize_text(text):
     """Normaliza texto para búsqueda"""
     text = text.lower().strip()
@@ -87,19 +96,64 @@ def find_best_image_matches(term, term_mappings):
     
     return best_matches[:6]  # Máximo 6 imágenes
 
-def improve_term_image_mapping():
+def find_best_image_matches_tfidf(term_mappings):
+    """Mejores asociaciones por similitud TF-IDF: lista de (fila de términos, mapeos) -> fila -> mapeos.
+
+    Puntúa todos los pares término-leyenda de una vez y se queda con las 6
+    mejores leyendas de cada término (tfidf_scoring.TOP_K).
+    """
+    from tfidf_scoring import rank_pairs, similarity_matrix
+
+    captions = {}
+    rows, columns, candidates = [], [], []
+    for row, (term_obj, mappings) in enumerate(term_mappings):
+        for mapping in mappings:
+            rows.append(row)
+            columns.append(captions.setdefault(mapping.get('caption', ''), len(captions)))
+            candidates.append(mapping)
+    if not candidates:
+        return {}
+
+    scores = similarity_matrix([term_obj['term'] for term_obj, _ in term_mappings],
+                               [term_obj.get('definition') for term_obj, _ in term_mappings],
+                               list(captions))
+    best = defaultdict(list)
+    pairs, values = rank_pairs(scores, rows, columns)
+    for pair, value in zip(pairs, values):
+        mapping = candidates[pair]
+        term_obj = term_mappings[rows[pair]][0]
+        mapping['match_score'] = round(float(value), 4)
+        normalized_caption = normalize_text(mapping.get('caption', ''))
+        mapping['matched_components'] = [component for component in extract_compound_components(term_obj['term'])
+                                         if component in normalized_caption]
+        best[term_obj.row].append(mapping)
+    return best
+
+def improve_term_image_mapping(scoring='rules'):
     """Mejora el mapeo de términos-imágenes con algoritmo mejorado"""
     
     # Cargar mapeo existente
     with open('data/organized/term_image_mapping.json', 'r', encoding='utf-8') as f:
         existing_mapping = json.load(f)
     
-    # Cargar términos
-    with open('data/organized/morphology_terms.json', 'r', encoding='utf-8') as f:
-        terms = json.load(f)
+    # Cargar términos (tabla columnar: solo se leen los nombres)
+    terms = load_table('data/organized/morphology_terms.json')
     
     print(f"Mejorando mapeo para {len(existing_mapping)} términos...")
     
+    # Join por ID de término: el mapeo está indexado por nombre, que puede
+    # diferir en mayúsculas, acentos, guiones o comas
+    alias_index = build_alias_index(rows(terms))
+    mapping_by_id = {}
+    for name, mappings in existing_mapping.items():
+        mapping_by_id.setdefault(lookup_term_id(alias_index, name) or name, mappings)
+    
+    # TF-IDF: todos los términos con mapeo se puntúan juntos, antes del recorrido
+    if scoring == 'tfidf':
+        tfidf_matches = find_best_image_matches_tfidf(
+            [(term_obj, mapping_by_id[record_id(term_obj)])
+             for term_obj in rows(terms) if record_id(term_obj) in mapping_by_id])
+    
     improved_mapping = {}
     terms_with_images = []
     stats = {
@@ -108,7 +162,7 @@ def improve_term_image_mapping():
         'total_with_images': 0
     }
     
-    for term_obj in terms:
+    for term_obj in rows(terms):
         term_name = term_obj['term']
         
         # Verificar si es término compuesto
@@ -118,11 +172,14 @@ def improve_term_image_mapping():
         if is_compound:
             stats['compound_terms'] += 1
         
-        if term_name in existing_mapping:
-            original_mappings = existing_mapping[term_name]
+        if record_id(term_obj) in mapping_by_id:
+            original_mappings = mapping_by_id[record_id(term_obj)]
             
             # Aplicar algoritmo mejorado
-            improved_matches = find_best_image_matches(term_name, original_mappings)
+            if scoring == 'tfidf':
+                improved_matches = tfidf_matches.get(term_obj.row, [])
+            else:
+                improved_matches = find_best_image_matches(term_name, original_mappings)
             
             if improved_matches:
                 improved_mapping[term_name] = improved_matches
@@ -168,5 +225,14 @@ def improve_term_image_mapping():
     
     return improved_mapping, terms_with_images
 
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scoring', choices=('rules', 'tfidf'), default='rules',
+                        help='puntuación: componentes del término, o similitud TF-IDF '
+                             '(requiere numpy y scipy; por defecto: rules)')
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    improve_term_image_mapping()
\ No newline at end of file
+    args = parse_args()
+    improve_term_image_mapping(args.scoring)
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+NDJSON (one JSON record per line) output and input for term and mapping artifacts
+
+The JSON artifacts are built as complete lists in memory and loaded whole
+again by the next script. In NDJSON mode a producer writes every record as
+soon as it has it and a consumer reads the records back as a generator, so
+memory stays flat as the corpus grows.
+
+A producer writes `<file>.ndjson.writing` and renames it to
+`<file>.ndjson` when done, so `<file>.ndjson` is always a complete file
+(the previous run's until the new one is finished).
+read_ndjson(..., follow=True) reads the `.writing` file while it exists and
+keeps waiting for new lines until it has been renamed, so a downstream
+stage can start while the upstream one is still running. A trailing line
+without a newline is a record still being written and is never returned.
+"""
+import json
+import os
+import time
+
+# Seconds between checks for new lines when following a file being written
+FOLLOW_INTERVAL = 0.2
+
+def writing_path(path):
+    """File a producer writes before renaming it to path"""
+    return f"{path}.writing"
+
+def write_ndjson(records, path):
+    """Write records (any iterable, e.g. a generator) one per line as they come; returns the count"""
+    temp_path = writing_path(path)
+    count = 0
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                # Readers following the file see every finished record
+                f.flush()
+                count += 1
+        os.replace(temp_path, path)
+    finally:
+        # A failed run leaves the previous file in place
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
+
+def open_following(path):
+    """(file, being written): the file a producer is writing, else the finished one, waiting for either"""
+    while True:
+        for candidate in (writing_path(path), path):
+            try:
+                return open(candidate, 'r', encoding='utf-8'), candidate != path
+            except FileNotFoundError:
+                pass
+        time.sleep(FOLLOW_INTERVAL)
+
+def still_writing(f, path):
+    """True while the open file is still the producer's .writing file (not yet renamed)"""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(writing_path(path)))
+    except FileNotFoundError:
+        return False
+
+def read_ndjson(path, follow=False):
+    """Records of an NDJSON file, one at a time.
+
+    With follow, wait for the file to appear and for new lines while its
+    producer is still writing it.
+    """
+    if follow:
+        f, writing = open_following(path)
+    else:
+        f, writing = open(path, 'r', encoding='utf-8'), False
+    with f:
+        pending = ''
+        finished = not writing
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith('\n'):
+                    if pending.strip():
+                        yield json.loads(pending)
+                    pending = ''
+                continue
+            # End of what has been written so far; without a newline, pending was never completed
+            if finished:
+                return
+            if still_writing(f, path):
+                time.sleep(FOLLOW_INTERVAL)
+            else:
+                # Renamed into place: one last read for lines written before
+                finished = True
+
+def iter_records(path, follow=False):
+    """Records of a .ndjson file or of a JSON list file, as a generator"""
+    if path.endswith('.ndjson'):
+        yield from read_ndjson(path, follow)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
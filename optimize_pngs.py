@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Losslessly recompress the PNGs written by pdfimages
+
+For every images/*.png this tries smaller pixel formats (opaque RGBA -> RGB,
+gray RGB -> L, <= 256 colours -> palette with 1/2/4/8-bit depth) and the
+zlib strategies Pillow exposes at level 9, drops ancillary metadata chunks,
+and keeps the smallest candidate whose decoded pixels are identical to the
+original. Optimized files are remembered by hash so re-runs skip them.
+
+PNGs with 16 bits per sample are left alone: Pillow decodes 16-bit colour
+images to 8 bits, so neither the re-encoding nor the pixel check would
+keep their precision.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageChops
+
+IMAGES_DIR = "images"
+CACHE_PATH = os.path.join(IMAGES_DIR, ".png_optimize_cache.json")
+REPORT_PATH = "data/png_optimization_report.json"
+EXTRACTION_MANIFEST = "data/extraction_metadata.json"
+
+# zlib strategies tried for every candidate; Pillow picks PNG row filters
+# adaptively for 8-bit modes and uses no filter for palette images
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE)
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def png_bit_depth(path):
+    """Bits per sample from the IHDR chunk (signature, length, type, width, height, depth)"""
+    with open(path, 'rb') as f:
+        header = f.read(25)
+    return header[24] if len(header) == 25 else None
+
+def palette_bits(color_count):
+    """Smallest PNG bit depth that can index this many palette entries"""
+    for bits in (1, 2, 4):
+        if color_count <= 1 << bits:
+            return bits
+    return 8
+
+def reduce_mode(image):
+    """Yield (label, image, save options) for every lossless pixel format to try"""
+    image.load()
+    if image.mode not in ('1', 'L', 'P', 'RGB', 'RGBA', 'LA', 'I', 'I;16'):
+        return
+
+    yield 'original', image, {}
+
+    if image.mode in ('I', 'I;16', '1'):
+        return
+
+    rgba = image.convert('RGBA')
+    opaque = rgba.getchannel('A').getextrema() == (255, 255)
+    base = rgba.convert('RGB') if opaque else rgba
+
+    if opaque:
+        r, g, b = base.split()
+        if ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(r, b).getbbox() is None:
+            base = r  # all channels equal: grayscale
+    if base.mode != image.mode:
+        yield base.mode, base, {}
+
+    colors = base.getcolors(256)
+    if colors is not None:
+        if base.mode == 'RGBA':
+            paletted = base.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+        else:
+            paletted = base.convert('P', palette=Image.Palette.ADAPTIVE, colors=len(colors))
+        yield f"P{palette_bits(len(colors))}", paletted, {'bits': palette_bits(len(colors))}
+
+def encode(image, options, strategy):
+    """PNG bytes for an image; only pixel data, palette and transparency are kept"""
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True, compress_level=9, compress_type=strategy, **options)
+    return buffer.getvalue()
+
+def same_pixels(reference, data):
+    """True when the encoded candidate decodes to exactly the reference RGBA bytes"""
+    with Image.open(io.BytesIO(data)) as candidate:
+        return candidate.convert('RGBA').tobytes() == reference
+
+def optimize_file(image_name):
+    """Worker: recompress one PNG in place; returns a report row"""
+    path = os.path.join(IMAGES_DIR, image_name)
+    original_bytes = os.path.getsize(path)
+    row = {'file': image_name, 'original_bytes': original_bytes, 'optimized_bytes': original_bytes,
+           'saved_bytes': 0, 'mode': None}
+    if png_bit_depth(path) == 16:
+        row.update(skipped='16-bit', sha256=file_sha256(path))
+        return row
+    try:
+        with Image.open(path) as image:
+            image.load()
+            reference = image.convert('RGBA').tobytes()
+            best = None
+            for label, candidate, options in reduce_mode(image):
+                for strategy in ZLIB_STRATEGIES:
+                    data = encode(candidate, options, strategy)
+                    if best is None or len(data) < len(best[1]):
+                        if same_pixels(reference, data):
+                            best = (label, data)
+    except (OSError, ValueError) as e:
+        return {'file': image_name, 'error': str(e)}
+
+    if best is not None and len(best[1]) < original_bytes:
+        with open(path, 'wb') as f:
+            f.write(best[1])
+        row.update(optimized_bytes=len(best[1]), saved_bytes=original_bytes - len(best[1]), mode=best[0])
+    row['sha256'] = file_sha256(path)
+    return row
+
+def update_extraction_manifest(rows):
+    """Refresh size/hash of rewritten images in extraction_metadata.json.
+
+    Otherwise extract_pdfs.py would see the new sizes as stale outputs and
+    re-extract the PDFs.
+    """
+    manifest = load_json(EXTRACTION_MANIFEST, None)
+    if not manifest:
+        return
+    changed = {os.path.join(IMAGES_DIR, row['file']): row for row in rows if row.get('saved_bytes')}
+    for entry in manifest:
+        for output in entry.get('outputs', []):
+            row = changed.get(output['path'])
+            if row:
+                output['size'] = row['optimized_bytes']
+                output['sha256'] = row['sha256']
+    with open(EXTRACTION_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='retry files that were already optimized')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cache = load_json(CACHE_PATH, {})
+
+    sources = sorted(f for f in os.listdir(IMAGES_DIR) if f.endswith('.png'))
+    pending = [
+        name for name in sources
+        if args.force or cache.get(name) != file_sha256(os.path.join(IMAGES_DIR, name))
+    ]
+    print(f"🗜️  {len(sources)} PNGs, {len(pending)} to optimize with {args.workers} workers")
+
+    rows = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            rows = list(executor.map(optimize_file, pending, chunksize=4))
+
+    errors = [row for row in rows if 'error' in row]
+    done = [row for row in rows if 'error' not in row]
+    for row in done:
+        cache[row['file']] = row['sha256']
+    # Forget files that no longer exist
+    cache = {name: digest for name, digest in cache.items() if name in sources}
+
+    with open(CACHE_PATH, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    update_extraction_manifest(done)
+
+    if not rows:
+        print(f"\n✓ Nothing to optimize, {REPORT_PATH} kept")
+        return
+
+    original_total = sum(row['original_bytes'] for row in done)
+    saved_total = sum(row['saved_bytes'] for row in done)
+    print()
+    print(f"📊 {len(done)} files: {original_total / 1e6:.1f} MB → "
+          f"{(original_total - saved_total) / 1e6:.1f} MB (saved {saved_total / 1e6:.1f} MB)")
+    for row in sorted(done, key=lambda row: row['saved_bytes'], reverse=True)[:10]:
+        if row['saved_bytes']:
+            pct = 100 * row['saved_bytes'] / row['original_bytes']
+            print(f"   {row['file'][:60]:60} -{row['saved_bytes'] / 1024:8.1f} KB ({pct:4.1f}%, {row['mode']})")
+    skipped = [row for row in done if 'skipped' in row]
+    if skipped:
+        print(f"⏭️  {len(skipped)} 16-bit files left unchanged")
+    if errors:
+        print(f"⚠️  {len(errors)} files could not be read")
+
+    # Merge with the previous report, so it covers every optimized file and
+    # not only this run's; --force starts a new one
+    previous = {} if args.force else load_json(REPORT_PATH, {})
+    details = {row['file']: row for row in previous.get('details', []) if row['file'] in sources}
+    details.update((row['file'], row) for row in done)
+    details = sorted(details.values(), key=lambda row: row['saved_bytes'], reverse=True)
+    report = {
+        'files': len(details),
+        'original_bytes': sum(row['original_bytes'] for row in details),
+        'saved_bytes': sum(row['saved_bytes'] for row in details),
+        'errors': errors,
+        'details': details,
+    }
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to {REPORT_PATH}")
+
+if __name__ == '__main__':
+    main()
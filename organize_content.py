@@ -8,9 +8,13 @@ import re
 from pathlib import Path
 from collections import defaultdict
 
+from document_model import load_document, source_span
+
 DATA_DIR = "data"
 IMAGES_DIR = "images"
 OUTPUT_DIR = "data/organized"
+# Characters of opening text covered by a document's preview_span
+PREVIEW_CHARS = 500
 
 # Define anatomical categories based on filenames
 CATEGORIES = {
@@ -39,12 +43,13 @@ def categorize_content(safe_name, original_filename):
     
     return 'other'
 
-def extract_terms_from_text(text_content):
+def extract_terms_from_text(text_content, lines=None):
     """Extract morphological terms and definitions from text"""
     terms = []
     
     # Look for term definitions (patterns like "Term: Definition" or bold terms)
-    lines = text_content.split('\n')
+    if lines is None:
+        lines = text_content.split('\n')
     
     for i, line in enumerate(lines):
         line = line.strip()
@@ -80,30 +85,40 @@ def main():
     organized = defaultdict(list)
     
     for item in metadata:
+        # Identical PDFs share one extracted text and image set
+        if item.get('alias_of'):
+            continue
+        
         category = categorize_content(item['safe_name'], item['original_filename'])
         
-        # Read text content
+        # Read text content (shared document model, cached by text hash)
         text_content = ""
+        lines = []
+        document = None
         if os.path.exists(item['text_file']):
-            with open(item['text_file'], 'r', encoding='utf-8', errors='ignore') as f:
-                text_content = f.read()
+            document = load_document(item['text_file'])
+            text_content, lines = document['text'], document['lines']
         
         # Find associated images
         image_prefix = item['image_prefix']
         images = []
-        if os.path.exists(IMAGES_DIR):
+        if 'outputs' in item:
+            images = [o['path'] for o in item['outputs'] if o['path'].startswith(image_prefix + '-')]
+        elif os.path.exists(IMAGES_DIR):
+            # "<prefix>-" so that "..._for_t" does not also match "..._for_the_ear"
             for img_file in sorted(os.listdir(IMAGES_DIR)):
-                if img_file.startswith(os.path.basename(image_prefix)):
+                if img_file.startswith(os.path.basename(image_prefix) + '-'):
                     images.append(os.path.join(IMAGES_DIR, img_file))
         
         # Extract terms from text
-        terms = extract_terms_from_text(text_content)
+        terms = extract_terms_from_text(text_content, lines)
         
         organized[category].append({
             'title': item['original_filename'].replace('.pdf', ''),
             'safe_name': item['safe_name'],
             'text_file': item['text_file'],
-            'text_preview': text_content[:500] if text_content else "",
+            # Byte range of the opening text in text_file (source_context.py reads it)
+            'preview_span': source_span(document, 0, min(PREVIEW_CHARS, len(text_content)))['span'] if document else None,
             'text_length': len(text_content),
             'images': images,
             'image_count': len(images),
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Source context of extracted terms, comments and captions
+
+Extracted records carry a 'span': a [start, end) UTF-8 byte range into
+their source text data/<source> (see document_model.source_span), plus
+'page' where the text has page breaks, and 'comment_span' for comments.
+figure_caption_spans.json holds the same for every caption. read_context()
+seeks straight to such a range and reads a bounded window around it, so
+the source paragraph is shown without loading the whole document; the web
+app does the same with an HTTP Range request.
+
+Usage:
+    python3 source_context.py "Palpebral fissure, long"
+    python3 source_context.py --caption elements_of_morphology_standard_terminology_for_the_ear 12
+"""
+import argparse
+import json
+import os
+import sys
+
+from ndjson_io import iter_records
+from term_ids import alias_index_path, load_alias_index, lookup_term_id, record_id
+
+DATA_DIR = "data"
+TERMS_FILE = "data/organized/morphology_terms_corrected.json"
+CAPTION_SPANS_FILE = "data/organized/figure_caption_spans.json"
+
+# Bytes read on each side of a span, and the most read for one window
+CONTEXT_BYTES = 600
+MAX_WINDOW_BYTES = 8192
+PARAGRAPH_BREAK = b'\n\n'
+
+def read_range(path, start, end):
+    """Bytes [start, end) of a file, read with one seek"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def read_context(path, span, radius=CONTEXT_BYTES, paragraph=True):
+    """Bounded window of a source text around a byte span.
+
+    Returns {'start', 'end', 'before', 'text', 'after', 'truncated'}:
+    the window's byte range and its text split around the span. With
+    paragraph, the window is cut at the blank lines closest to the span.
+    At most MAX_WINDOW_BYTES are read; a longer span is cut short.
+    """
+    start, end = span
+    truncated = end - start > MAX_WINDOW_BYTES
+    if truncated:
+        end = start + MAX_WINDOW_BYTES
+    radius = min(radius, (MAX_WINDOW_BYTES - (end - start)) // 2)
+    window_start = max(0, start - radius)
+    data = read_range(path, window_start, end + radius)
+    head, body, tail = data[:start - window_start], data[start - window_start:end - window_start], data[end - window_start:]
+
+    if paragraph:
+        cut = head.rfind(PARAGRAPH_BREAK)
+        if cut >= 0:
+            window_start += cut + len(PARAGRAPH_BREAK)
+            head = head[cut + len(PARAGRAPH_BREAK):]
+        cut = tail.find(PARAGRAPH_BREAK)
+        if cut >= 0:
+            tail = tail[:cut]
+
+    # A window edge may fall inside a multi-byte character: drop the partial bytes
+    return {
+        'start': window_start,
+        'end': end + len(tail),
+        'before': head.decode('utf-8', errors='ignore'),
+        'text': body.decode('utf-8', errors='ignore'),
+        'after': tail.decode('utf-8', errors='ignore'),
+        'truncated': truncated,
+    }
+
+def record_context(record, field='span', data_dir=DATA_DIR, **kwargs):
+    """Context of a term or caption record ('span', or 'comment_span' of a term);
+    None without one or when its source text cannot be read"""
+    span = record.get(field)
+    if not span or not record.get('source'):
+        return None
+    try:
+        context = read_context(os.path.join(data_dir, os.path.basename(record['source'])), span, **kwargs)
+    except OSError:
+        return None
+    context['page'] = record.get('page')
+    return context
+
+def find_term(name, terms_file=TERMS_FILE):
+    """Term record of a name or ID (via the term list's alias index), or None"""
+    alias_file = alias_index_path(terms_file)
+    wanted = lookup_term_id(load_alias_index(alias_file), name) if os.path.exists(alias_file) else None
+    for term in iter_records(terms_file):
+        if record_id(term) == wanted or term['term'] == name:
+            return term
+    return None
+
+def caption_record(document, figure, spans_file=CAPTION_SPANS_FILE):
+    """Span record of a figure caption, or None"""
+    if not os.path.exists(spans_file):
+        return None
+    with open(spans_file, 'r', encoding='utf-8') as f:
+        spans = json.load(f)
+    return spans.get(document, {}).get(str(figure))
+
+def print_context(title, context):
+    page = f" (p. {context['page']})" if context.get('page') else ""
+    print(f"📍 {title}{page} — bytes {context['start']}-{context['end']}")
+    print()
+    print(f"{context['before']}»{context['text']}«{context['after']}".strip())
+    if context['truncated']:
+        print("   (span cut at the window limit)")
+    print()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name', nargs='?', help='term name or ID')
+    parser.add_argument('--caption', nargs=2, metavar=('DOCUMENT', 'FIGURE'),
+                        help='show a figure caption instead of a term')
+    parser.add_argument('--terms', default=TERMS_FILE,
+                        help=f'term file, JSON or NDJSON (default: {TERMS_FILE})')
+    parser.add_argument('--radius', type=int, default=CONTEXT_BYTES,
+                        help=f'bytes of context on each side (default: {CONTEXT_BYTES})')
+    args = parser.parse_args()
+    if not args.name and not args.caption:
+        parser.error('give a term name or --caption DOCUMENT FIGURE')
+    return args
+
+def main():
+    args = parse_args()
+
+    if args.caption:
+        document, figure = args.caption
+        record = caption_record(document, figure)
+        context = record_context(record, radius=args.radius) if record else None
+        if context is None:
+            print(f"❌ No caption span for Fig. {figure} in {document}")
+            sys.exit(1)
+        print_context(f"Fig. {figure} — {record['source']}", context)
+        return
+
+    term = find_term(args.name, args.terms)
+    if term is None:
+        print(f"❌ Term not found: {args.name}")
+        sys.exit(1)
+    context = record_context(term, radius=args.radius)
+    if context is None:
+        print(f"⚠️  {term['term']} has no source span or its text is missing; re-run the extractor")
+        sys.exit(1)
+    print_context(f"{term['term']} — {term['source']}", context)
+    comment = record_context(term, 'comment_span', radius=0)
+    if comment:
+        print_context("Comment", comment)
+
+if __name__ == '__main__':
+    main()
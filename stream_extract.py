@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Fused text pipeline: pdftotext -> term and caption extraction in one process
+
+Each PDF's `pdftotext -layout` output is read from stdout, decoded and
+tokenized once into the shared document model, which is handed to the term
+extractors and the caption extractor, instead of being written to
+data/*.txt and re-read by every script. The .txt files are only written
+with --cache-text; source spans (term 'span'/'page', and
+figure_caption_spans.json) point into them, so they are only recorded
+then.
+"""
+import argparse
+import json
+import os
+import subprocess
+from pathlib import Path
+
+import extract_terms
+import extract_terms_correct
+from column_layout import reading_order_text
+from document_model import document_from_text, document_captions, document_caption_spans
+from extract_pdfs import (PDF_DIR, list_pdf_files, load_manifest, bbox_command,
+                          fingerprint_source, find_canonical_sources, build_metadata_entry)
+from term_extraction import save_term_outputs, tag_terms
+
+OUTPUT_DIR = "data/organized"
+
+def stream_text(pdf_path, reading_order=False):
+    """Run pdftotext with the text written to stdout and return it decoded.
+
+    With reading_order the word boxes are read instead and turned into
+    single-column text.
+    """
+    cmd = bbox_command(pdf_path) if reading_order else ['pdftotext', '-layout', pdf_path, '-']
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    text = result.stdout.decode('utf-8', errors='ignore')
+    return reading_order_text(text) if reading_order else text
+
+def list_documents():
+    """Document entries for the current PDFs, identical copies skipped"""
+    previous_manifest = load_manifest()
+    sources = [
+        (pdf_file, fingerprint_source(pdf_file, previous_manifest.get(pdf_file)))
+        for pdf_file in list_pdf_files()
+    ]
+    canonical = find_canonical_sources(sources)
+    entries = [
+        build_metadata_entry(pdf_file, fingerprint['pdf_sha256'], canonical[fingerprint['pdf_sha256']])
+        for pdf_file, fingerprint in sources
+    ]
+    return [entry for entry in entries if 'alias_of' not in entry]
+
+def process_document(entry, text_content, results, spans=False):
+    """Feed one document's text to every extractor; returns (terms, captions) found.
+
+    With spans, terms and captions record their byte ranges in entry['text_file'].
+    """
+    category = extract_terms_correct.categorize_by_topic(entry['original_filename'])
+    # Cached under the text hash, so later stages reuse it if --cache-text wrote the file
+    document = document_from_text(text_content)
+
+    # Extractors only use the file name for the 'source' field; given the
+    # document model they also record spans into that file
+    span_document = document if spans else None
+    results_by_key = (
+        ('terms', extract_terms.extract_morphology_terms(text_content, entry['text_file'], span_document)),
+        ('terms_corrected', extract_terms_correct.extract_terms_with_definitions(
+            text_content, entry['text_file'], document['term_blocks'], span_document)),
+    )
+    term_count = 0
+    for key, terms in results_by_key:
+        results[key].extend(tag_terms(terms, category, entry['original_filename']))
+        term_count += len(terms)
+
+    captions = document_captions(document)
+    if captions:
+        results['captions'][Path(entry['text_file']).stem] = captions
+    if captions and spans:
+        results['caption_spans'][Path(entry['text_file']).stem] = document_caption_spans(
+            document, os.path.basename(entry['text_file']))
+
+    return term_count, len(captions)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cache-text', action='store_true',
+                        help='also write each document text to data/<document_id>.txt')
+    parser.add_argument('--reading-order', action='store_true',
+                        help='rebuild single-column text from word boxes instead of pdftotext -layout')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+    results = {'terms': [], 'terms_corrected': [], 'captions': {}, 'caption_spans': {}}
+
+    print("="*70)
+    print("🌊 STREAMING EXTRACTION (pdftotext → terms + captions)")
+    print("="*70)
+    print()
+
+    for entry in list_documents():
+        pdf_path = os.path.join(PDF_DIR, entry['original_filename'])
+        print(f"📄 {entry['original_filename'][:65]}")
+
+        try:
+            text_content = stream_text(pdf_path, args.reading_order)
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            print(f"   ⚠️  pdftotext failed: {e}")
+            continue
+
+        if args.cache_text:
+            with open(entry['text_file'], 'w', encoding='utf-8') as f:
+                f.write(text_content)
+
+        term_count, caption_count = process_document(entry, text_content, results, args.cache_text)
+        print(f"   ✅ {term_count} terms, {caption_count} captions")
+
+    # morphology_terms.json is a symlink to morphology_terms_corrected.json,
+    # so the corrected outputs are saved last and win
+    save_term_outputs(results['terms'], extract_terms.EXTRACTOR['suffix'])
+    unique_terms, categories_dict, files = save_term_outputs(results['terms_corrected'],
+                                                             extract_terms_correct.EXTRACTOR['suffix'])
+
+    captions_file = f"{OUTPUT_DIR}/figure_captions.json"
+    with open(captions_file, 'w', encoding='utf-8') as f:
+        json.dump(results['captions'], f, indent=2, ensure_ascii=False)
+    written = [*files, captions_file]
+    if args.cache_text:
+        spans_file = f"{OUTPUT_DIR}/figure_caption_spans.json"
+        with open(spans_file, 'w', encoding='utf-8') as f:
+            json.dump(results['caption_spans'], f, indent=2, ensure_ascii=False)
+        written.append(spans_file)
+
+    print()
+    print(f"📊 {len(unique_terms)} unique terms in {len(categories_dict)} categories")
+    print(f"   {sum(len(c) for c in results['captions'].values())} captions from {len(results['captions'])} documents")
+    print()
+    print("💾 Files created:")
+    for path in written:
+        print(f"   • {path}")
+    if not args.cache_text:
+        print("   (text not cached, so no source spans; use --cache-text to write data/*.txt)")
+
+if __name__ == '__main__':
+    main()
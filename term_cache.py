@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Per-document cache of term extraction results
+
+The term extractors (term_extraction.py) store the terms (and rule
+statistics) of every document as a fragment in
+data/.term_cache/<extractor>/<key>.json. The key hashes the document text,
+the manifest fields copied into each term and the extractor version, i.e.
+the SHA-256 of the source files the extraction depends on, so editing one
+paper's text or any extraction rule invalidates exactly the fragments it
+affects. The aggregate outputs are rebuilt from the fragments on every run,
+which is a cheap merge; only documents without a fragment are extracted.
+"""
+import hashlib
+import json
+import os
+
+CACHE_DIR = "data/.term_cache"
+
+def source_version(*paths):
+    """Hash of the given source files (relative to this directory)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(os.path.join(here, path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def fragment_key(item, version):
+    """Cache key of a manifest entry: text hash, tagging fields and extractor version"""
+    with open(item['text_file'], 'rb') as f:
+        text_hash = hashlib.sha256(f.read()).hexdigest()
+    identity = '\0'.join([version, text_hash, item['text_file'], item['original_filename']])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def fragment_path(extractor, key):
+    return os.path.join(CACHE_DIR, extractor, f"{key}.json")
+
+def load_fragment(extractor, key):
+    """(terms, rule statistics) of a cached document, or None"""
+    path = fragment_path(extractor, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            fragment = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return fragment['terms'], fragment['rule_stats']
+
+def save_fragment(extractor, key, terms, stats):
+    """Write a fragment through a temporary file, as the document cache does"""
+    path = fragment_path(extractor, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'terms': terms, 'rule_stats': stats}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def remove_stale_fragments(extractor, keys):
+    """Delete fragments of an extractor not in keys (old texts or versions)"""
+    directory = os.path.join(CACHE_DIR, extractor)
+    if not os.path.isdir(directory):
+        return 0
+    keep = {f"{key}.json" for key in keys}
+    removed = 0
+    for name in os.listdir(directory):
+        if name not in keep:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+def extract_with_cache(items, extract_all, extractor, version, workers, use_cache=True):
+    """(terms, rule statistics) of every item, in item order, and the number of cache hits.
+
+    Only documents without a valid fragment go through extract_all(items,
+    workers); their results are saved as new fragments. The results are a
+    generator: each document comes out as soon as it (and every document
+    before it) is done.
+    """
+    keys = [fragment_key(item, version) for item in items]
+    cached = [load_fragment(extractor, key) if use_cache else None for key in keys]
+    missing = [item for item, result in zip(items, cached) if result is None]
+    remove_stale_fragments(extractor, keys)
+    fresh = iter(extract_all(missing, workers) if missing else [])
+    return merge_fragments(extractor, keys, cached, fresh), len(items) - len(missing)
+
+def merge_fragments(extractor, keys, cached, fresh):
+    """Cached results, with fresh ones (in order) filling the gaps and saved as fragments"""
+    for key, result in zip(keys, cached):
+        if result is None:
+            result = next(fresh)
+            save_fragment(extractor, key, *result)
+        yield result
+
+def write_json_if_changed(data, path):
+    """Write JSON (indent=2) unless the file already holds exactly that; True if written"""
+    content = json.dumps(data, indent=2, ensure_ascii=False)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
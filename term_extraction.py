@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Shared driver of the term extractors
+
+extract_terms.py (smart, two-column "Term: Definition") and
+extract_terms_correct.py (Definition: blocks) differ only in how they find
+terms in a document and in their validation rules. Everything around that
+lives here: the per-document worker and its process pool, the result cache
+(term_cache.py), the JSON and NDJSON outputs with the term index and alias
+index, and the common command-line options.
+
+An extractor is a module defining EXTRACTOR:
+
+    module       the module's __name__; workers look the extractor up by it,
+                 so the rules whose statistics they collect are the ones
+                 the extract function validates with, also in a child process
+    name         cache namespace ('smart', 'corrected')
+    version      term_cache.source_version() of the files extraction depends on
+    rules        compiled rule set (term_rules.compile_rules)
+    extract      extract(document, filename) -> term dicts
+    categorize   original file name -> category
+    suffix       output file suffix: morphology_terms<suffix>.json, ...
+"""
+import argparse
+import heapq
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from document_model import load_document
+from ndjson_io import read_ndjson, write_ndjson
+from term_cache import extract_with_cache, write_json_if_changed
+from term_ids import alias_index_path, save_alias_index, term_id
+from term_rules import new_stats, merge_stats, reset_stats
+
+DATA_DIR = "data"
+OUTPUT_DIR = "data/organized"
+
+def term_key(term):
+    """Duplicate key: case-insensitive name within a category"""
+    return (term['term'].lower().strip(), term['category'])
+
+def sort_key(term):
+    return (term['category'], term['term'].lower())
+
+def save_term_outputs(all_terms, suffix=''):
+    """Deduplicate, sort and save the term list, category grouping, index and alias index"""
+    # Remove duplicates - keep first occurrence
+    seen = set()
+    unique_terms = []
+    for term in all_terms:
+        key = term_key(term)
+        if key not in seen:
+            seen.add(key)
+            unique_terms.append(term)
+
+    # Sort terms alphabetically by category then term name
+    unique_terms.sort(key=sort_key)
+
+    # Save all terms
+    terms_file = f"{OUTPUT_DIR}/morphology_terms{suffix}.json"
+    write_json_if_changed(unique_terms, terms_file)
+
+    # Save terms by category: one pass, since unique_terms is already sorted
+    # by (category, term) and each group comes out sorted by term
+    categories_dict = {}
+    for term in unique_terms:
+        categories_dict.setdefault(term['category'], []).append(term)
+
+    categories_file = f"{OUTPUT_DIR}/terms_by_category{suffix}.json"
+    write_json_if_changed(categories_dict, categories_file)
+
+    # Create index
+    index = {
+        'total_terms': len(unique_terms),
+        'categories': {cat: len(terms) for cat, terms in categories_dict.items()},
+        'sample_terms': [t['term'] for t in unique_terms[:30]]
+    }
+
+    index_file = f"{OUTPUT_DIR}/terms_index{suffix}.json"
+    write_json_if_changed(index, index_file)
+
+    # Alias index: every variant of a term name -> term ID (one per term list)
+    alias_file = alias_index_path(terms_file)
+    save_alias_index(unique_terms, alias_file)
+
+    return unique_terms, categories_dict, (terms_file, categories_file, index_file, alias_file)
+
+def save_term_ndjson(document_terms, suffix=''):
+    """NDJSON mode: stream deduplicated terms to disk as documents finish.
+
+    document_terms yields each document's terms. Records are written in
+    document order (sorting would need them all in memory); the index is
+    the same as in JSON mode, its sample taken in a second pass over the
+    file. There is no by-category file: every record carries its category.
+    """
+    seen = set()
+    counts = {}
+    def unique_terms():
+        for terms in document_terms:
+            for term in terms:
+                key = term_key(term)
+                if key not in seen:
+                    seen.add(key)
+                    counts[term['category']] = counts.get(term['category'], 0) + 1
+                    yield term
+
+    terms_file = f"{OUTPUT_DIR}/morphology_terms{suffix}.ndjson"
+    total = write_ndjson(unique_terms(), terms_file)
+
+    # Same order as the sorted JSON list (nsmallest is stable)
+    sample = heapq.nsmallest(30, read_ndjson(terms_file), key=sort_key)
+    index = {
+        'total_terms': total,
+        'categories': {cat: counts[cat] for cat in sorted(counts)},
+        'sample_terms': [t['term'] for t in sample]
+    }
+
+    index_file = f"{OUTPUT_DIR}/terms_index{suffix}.json"
+    write_json_if_changed(index, index_file)
+
+    alias_file = alias_index_path(terms_file)
+    save_alias_index(read_ndjson(terms_file), alias_file)
+
+    return total, index['categories'], sample, (terms_file, index_file, alias_file)
+
+def tag_terms(terms, category, original_filename):
+    """Add category, document and stable ID (term_ids.py) to a document's terms"""
+    for term in terms:
+        term['category'] = category
+        term['document'] = original_filename.replace('.pdf', '')
+        term['id'] = term_id(term['term'])
+    return terms
+
+def extract_document_terms(module, item):
+    """Worker: (terms, rule statistics) of one manifest entry; terms are tagged with category and document"""
+    extractor = importlib.import_module(module).EXTRACTOR
+    reset_stats(extractor['rules'])
+    # Shared document model (cached by text hash)
+    document = load_document(item['text_file'])
+    terms = extractor['extract'](document, item['text_file'])
+    tag_terms(terms, extractor['categorize'](item['original_filename']), item['original_filename'])
+    return terms, reset_stats(extractor['rules'])
+
+def extract_all_terms(extractor, items, workers):
+    """(terms, rule statistics) of every item, in item order, as each is done; documents are spread over worker processes"""
+    worker = partial(extract_document_terms, extractor['module'])
+    if workers <= 1 or len(items) <= 1:
+        yield from map(worker, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in input order, so the merge is the same as a serial run
+        yield from executor.map(worker, items)
+
+def parse_args(description, suffix=''):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: CPU count; 1 runs in-process)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='re-extract every document instead of reusing cached results')
+    parser.add_argument('--ndjson', action='store_true',
+                        help=f'stream terms to morphology_terms{suffix}.ndjson (one record per line) '
+                             'instead of the JSON list and by-category files')
+    return parser.parse_args()
+
+def extract_and_save(extractor, args, report_document):
+    """Run an extractor over the manifest and save its outputs.
+
+    report_document(item, terms) prints each document's progress as it is
+    done. Returns the summary: total_terms, category_counts, examples (up to
+    30 terms in output order), files, documents, cache_hits and rule_stats.
+    """
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+    # Load metadata
+    with open(f"{DATA_DIR}/extraction_metadata.json", 'r') as f:
+        metadata = json.load(f)
+
+    # Identical PDFs share one extracted text
+    items = [
+        item for item in metadata
+        if not item.get('alias_of') and os.path.exists(item['text_file'])
+    ]
+
+    rule_stats = new_stats()
+    # A generator: with --ndjson each document's terms are written as soon as it is done
+    results, cache_hits = extract_with_cache(items, partial(extract_all_terms, extractor), extractor['name'],
+                                             extractor['version'], args.workers, use_cache=not args.no_cache)
+    def document_terms():
+        """Terms of each document as it is done, reporting progress"""
+        for item, (terms, stats) in zip(items, results):
+            merge_stats(rule_stats, stats)
+            report_document(item, terms)
+            yield terms
+
+    if args.ndjson:
+        total_terms, category_counts, examples, files = save_term_ndjson(document_terms(), extractor['suffix'])
+    else:
+        all_terms = [term for terms in document_terms() for term in terms]
+        unique_terms, categories_dict, files = save_term_outputs(all_terms, extractor['suffix'])
+        total_terms = len(unique_terms)
+        category_counts = {cat: len(terms) for cat, terms in categories_dict.items()}
+        examples = unique_terms[:30]
+
+    return {
+        'total_terms': total_terms,
+        'category_counts': category_counts,
+        'examples': examples,
+        'files': files,
+        'documents': len(items),
+        'cache_hits': cache_hits,
+        'rule_stats': rule_stats,
+    }
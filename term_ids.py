@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Canonical term IDs and the alias index
+
+Terms used to be joined across files by their display string, so a casing,
+accent or translation change broke every join. Each extracted term now gets
+an `id` derived from its normalized text (accents folded, lowercase, every
+run of non-alphanumerics as one space): "Palpebral Fissure, Long" ->
+"palpebral-fissure-long". The ID is stored with the term, so later edits of
+the display text keep it.
+
+term_aliases.json maps every lookup key of a term to its ID:
+
+    normalized text          "palpebral fissure long"
+    comma inversion          "long palpebral fissure" (last part first)
+    compact forms            "palpebralfissurelong", ... (hyphen/space variants)
+
+plus "references": term ID -> ID of its "see" target (reference_to, from
+clean_data.py). A lookup normalizes the query and tries it and its compact
+form: two dict lookups. index.html normalizes the same way (normalizeTermKey).
+
+Each term list has its own index (alias_index_path): term_aliases.json for
+morphology_terms.json, the list the web app loads, and
+term_aliases_corrected.json for morphology_terms_corrected.json.
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+ALIAS_INDEX_PATH = "data/organized/term_aliases.json"
+
+# Combining marks removed after NFKD; the same range as the JavaScript side
+COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+NON_ALPHANUMERIC = re.compile('[^a-z0-9]+')
+
+def normalize_term_text(text):
+    """Accent-folded, lowercase text with runs of other characters as one space"""
+    text = COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text)).lower()
+    return NON_ALPHANUMERIC.sub(' ', text).strip()
+
+def term_id(term):
+    """Stable ID of a term name"""
+    normalized = normalize_term_text(term)
+    if normalized:
+        return normalized.replace(' ', '-')
+    # Nothing left after folding (e.g. a non-Latin name): hash the original
+    return 'term-' + hashlib.sha1(term.encode('utf-8')).hexdigest()[:10]
+
+def record_id(record):
+    """ID of a term record (dict or term_table row); computed for records older than IDs"""
+    return record.get('id') or term_id(record['term'])
+
+def inverted_term(term):
+    """'Palpebral Fissure, Long' -> 'Long Palpebral Fissure'; None without a comma"""
+    parts = [part.strip() for part in term.split(',') if part.strip()]
+    if len(parts) < 2:
+        return None
+    return ' '.join([parts[-1]] + parts[:-1])
+
+def alias_keys(term):
+    """Lookup keys of a term name: normalized, comma-inverted and compact forms"""
+    keys = [normalize_term_text(term)]
+    inverted = inverted_term(term)
+    if inverted:
+        keys.append(normalize_term_text(inverted))
+    keys += [key.replace(' ', '') for key in keys]
+    return [key for key in dict.fromkeys(keys) if key]
+
+def build_alias_index(terms):
+    """{'aliases': key -> ID, 'references': ID -> see-target ID} for term records.
+
+    A term's own normalized text wins over another term's variant forms;
+    otherwise the first term listed keeps a shared key.
+    """
+    terms = list(terms)
+    aliases = {}
+    for term in terms:
+        aliases.setdefault(normalize_term_text(term['term']), record_id(term))
+    for term in terms:
+        for key in alias_keys(term['term']):
+            aliases.setdefault(key, record_id(term))
+
+    index = {'aliases': aliases, 'references': {}}
+    for term in terms:
+        if term.get('reference_to'):
+            target = lookup_term_id(index, term['reference_to'])
+            if target:
+                index['references'][record_id(term)] = target
+    return index
+
+def lookup_term_id(index, name):
+    """ID for a term name (or ID: it normalizes to the same key) via the alias index; None if unknown"""
+    key = normalize_term_text(name)
+    aliases = index['aliases']
+    return aliases.get(key) or aliases.get(key.replace(' ', ''))
+
+def alias_index_path(terms_file):
+    """Alias index of a term list: morphology_terms<suffix>.json/.ndjson -> term_aliases<suffix>.json"""
+    stem = os.path.splitext(os.path.basename(terms_file))[0]
+    suffix = stem[len('morphology_terms'):] if stem.startswith('morphology_terms') else '_' + stem
+    return os.path.join(os.path.dirname(terms_file), f"term_aliases{suffix}.json")
+
+def save_alias_index(terms, path=ALIAS_INDEX_PATH):
+    """Build the alias index of the term records and write it; returns the index"""
+    index = build_alias_index(terms)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    return index
+
+def load_alias_index(path=ALIAS_INDEX_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Declarative validation rules for extracted terms
+
+Each extractor describes what a valid term looks like as a list of
+(name, kind, value) rules. compile_rules() turns every text rule (prefix,
+substring, exact and regex bans) into one combined regular expression with
+a named group per rule, so a candidate is checked with a single scan plus
+a few length comparisons. Every rejection is counted against the rule that
+fired, with a few example terms, so we can see which rules reject what.
+
+Rule kinds:
+    capitalized             term must start with an uppercase letter
+    min_length / max_length term length bounds (characters, inclusive)
+    max_words               maximum number of whitespace-separated words
+    min_definition_length   minimum definition length (characters, inclusive)
+    prefix / substring / exact / regex
+                            ban terms that start with, contain, equal or
+                            match the value; a trailing "/i" on the kind
+                            (e.g. "regex/i") ignores case
+"""
+import re
+
+# Example terms kept per rule in the statistics
+EXAMPLES_PER_RULE = 5
+
+# Smart extractor (extract_terms.py)
+SMART_TERM_RULES = [
+    ('capitalized', 'capitalized', None),
+    ('anatomical_variation', 'regex/i', r'^anatomical?\s+variation'),
+    ('all_the', 'regex/i', r'^all\s+the\s+'),
+    ('figure', 'regex/i', r'fig\.'),
+    ('table', 'regex/i', r'table\s+\d'),
+    ('http', 'substring/i', 'http'),
+    ('www', 'substring/i', 'www.'),
+    ('dot_com', 'substring/i', '.com'),
+    ('email', 'substring', '@'),
+    ('copyright', 'substring/i', 'copyright'),
+    ('received', 'regex/i', r'received\s+\d'),
+    ('doi', 'regex/i', r'doi\s*:'),
+    ('numbered', 'regex', r'^\d+\.'),
+    ('blank_line', 'regex', r'\n{2,}'),
+    ('min_length', 'min_length', 3),
+    ('max_length', 'max_length', 80),
+    ('max_words', 'max_words', 10),
+    ('short_definition', 'min_definition_length', 21),
+]
+
+# Block extractor (extract_terms_correct.py)
+CORRECTED_TERM_RULES = [
+    ('empty', 'min_length', 1),
+    ('max_length', 'max_length', 99),
+    ('max_words', 'max_words', 15),
+    ('http', 'prefix', 'http'),
+    ('www', 'prefix', 'www'),
+    ('doi', 'prefix', 'DOI'),
+    ('figure', 'prefix', 'Fig'),
+    ('table', 'prefix', 'Table'),
+    ('copyright', 'substring', 'Copyright'),
+    ('received', 'substring', 'Received'),
+    ('email', 'substring', '@'),
+    ('label_definition', 'exact', 'Definition'),
+    ('label_comment', 'exact', 'Comment'),
+    ('label_synonym', 'exact', 'Synonym'),
+    ('short_definition', 'min_definition_length', 11),
+]
+
+def rule_pattern(kind, value):
+    """Regex source for one text rule"""
+    base, _, flags = kind.partition('/')
+    if base == 'prefix':
+        source = '^' + re.escape(value)
+    elif base == 'substring':
+        source = re.escape(value)
+    elif base == 'exact':
+        source = '^' + re.escape(value) + r'\Z'
+    elif base == 'regex':
+        source = value
+    else:
+        raise ValueError(f"Unknown rule kind: {kind}")
+    return f"(?i:{source})" if flags == 'i' else source
+
+def compile_rules(rules):
+    """Compile a rule list into a rule set with empty statistics"""
+    bounds = {}
+    text_rules = []
+    for name, kind, value in rules:
+        if kind in ('capitalized', 'min_length', 'max_length', 'max_words', 'min_definition_length'):
+            bounds[kind] = (name, value)
+        else:
+            text_rules.append(f"(?P<{name}>{rule_pattern(kind, value)})")
+    return {
+        'rules': rules,
+        'bounds': bounds,
+        # One alternation: the first rule to match during the scan names the rejection
+        'pattern': re.compile('|'.join(text_rules)) if text_rules else None,
+        'stats': new_stats(),
+    }
+
+def new_stats():
+    return {'checked': 0, 'rejected': {}, 'examples': {}}
+
+def reset_stats(ruleset):
+    """Start counting afresh (e.g. per document in a worker process); returns the old statistics"""
+    stats, ruleset['stats'] = ruleset['stats'], new_stats()
+    return stats
+
+def rejecting_rule(ruleset, term, definition=None):
+    """Name of the first rule the term (and definition) breaks, or None"""
+    bounds = ruleset['bounds']
+    if 'capitalized' in bounds and not term[:1].isupper():
+        return bounds['capitalized'][0]
+    if 'min_length' in bounds and len(term) < bounds['min_length'][1]:
+        return bounds['min_length'][0]
+    if 'max_length' in bounds and len(term) > bounds['max_length'][1]:
+        return bounds['max_length'][0]
+    if 'max_words' in bounds and len(term.split()) > bounds['max_words'][1]:
+        return bounds['max_words'][0]
+    if ruleset['pattern'] is not None:
+        match = ruleset['pattern'].search(term)
+        if match:
+            return match.lastgroup
+    if definition is not None and 'min_definition_length' in bounds:
+        if len(definition) < bounds['min_definition_length'][1]:
+            return bounds['min_definition_length'][0]
+    return None
+
+def validate_term(ruleset, term, definition=None):
+    """True when the term passes every rule; rejections are counted per rule"""
+    stats = ruleset['stats']
+    stats['checked'] += 1
+    rule = rejecting_rule(ruleset, term, definition)
+    if rule is None:
+        return True
+    stats['rejected'][rule] = stats['rejected'].get(rule, 0) + 1
+    examples = stats['examples'].setdefault(rule, [])
+    if len(examples) < EXAMPLES_PER_RULE:
+        examples.append(term)
+    return False
+
+def merge_stats(total, stats):
+    """Add one statistics dict (e.g. from a worker) into another"""
+    total['checked'] += stats['checked']
+    for rule, count in stats['rejected'].items():
+        total['rejected'][rule] = total['rejected'].get(rule, 0) + count
+    for rule, examples in stats['examples'].items():
+        kept = total['examples'].setdefault(rule, [])
+        kept.extend(examples[:EXAMPLES_PER_RULE - len(kept)])
+    return total
+
+def print_rule_stats(stats):
+    """Print how many candidates each rule rejected, with examples"""
+    rejected = sum(stats['rejected'].values())
+    print(f"🧹 {stats['checked']} candidates checked, {rejected} rejected")
+    for rule, count in sorted(stats['rejected'].items(), key=lambda x: x[1], reverse=True):
+        examples = ', '.join(repr(e[:30]) for e in stats['examples'].get(rule, [])[:3])
+        print(f"   {rule:20} {count:6}   e.g. {examples}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Compact columnar table of extracted terms
+
+Term files hold one dict per term repeating the keys term, definition,
+source, comment, category and document, with the same long source and
+document strings on every row. A term table stores them as columns
+instead:
+
+    source, category, document   interned: one list of distinct values and
+                                 an array of value IDs per row
+    term, definition, comment,   string heaps: one UTF-8 buffer per column and
+    id                           an array of (start, end) byte offsets per row
+    span, comment_span           two integer arrays (start, end) per column
+    page                         an integer array
+
+Rows are TermRow views (two slots: table and row number), read and written
+like the dicts they replace (row['term'], row.get('comment'),
+row['definition'] = ...), so scripts walk a table without copying entries.
+Overwritten text is kept in a per-column overlay next to the heap.
+load_table()/save_table() read and write the existing JSON shapes (a list
+of terms, a category -> terms dict, or NDJSON); unknown keys are kept per
+row and written after the known ones.
+"""
+import json
+from array import array
+
+from ndjson_io import read_ndjson, write_ndjson
+
+# Known keys, in the order the extractors write them
+FIELDS = ('term', 'definition', 'source', 'span', 'page', 'comment', 'comment_span',
+          'category', 'document', 'id')
+INTERNED_FIELDS = ('source', 'category', 'document')
+HEAP_FIELDS = ('term', 'definition', 'comment', 'id')
+# Source provenance (document_model.source_span): byte ranges and page numbers
+SPAN_FIELDS = ('span', 'comment_span')
+NUMBER_FIELDS = ('page',)
+
+# Offset/ID marking a missing value
+MISSING = -1
+
+def new_table():
+    return {
+        'size': 0,
+        'values': {field: [] for field in INTERNED_FIELDS},
+        'lookup': {field: {} for field in INTERNED_FIELDS},
+        'ids': {field: array('i') for field in INTERNED_FIELDS},
+        'heaps': {field: {'data': b'', 'pending': [], 'length': 0, 'starts': array('q'),
+                          'ends': array('q'), 'overlay': {}}
+                  for field in HEAP_FIELDS},
+        'spans': {field: (array('q'), array('q')) for field in SPAN_FIELDS},
+        'numbers': {field: array('q') for field in NUMBER_FIELDS},
+        # row -> {key: value} for keys outside FIELDS
+        'extras': {},
+        # None for a flat list, else group key -> row numbers (e.g. category -> terms)
+        'groups': None,
+    }
+
+def intern_value(table, field, value):
+    """ID of a value in an interned column, adding it if new"""
+    if value is None:
+        return MISSING
+    lookup = table['lookup'][field]
+    value_id = lookup.get(value)
+    if value_id is None:
+        value_id = lookup[value] = len(table['values'][field])
+        table['values'][field].append(value)
+    return value_id
+
+def heap_append(heap, value):
+    """Add a row's value to the end of a string heap"""
+    if value is None:
+        heap['starts'].append(MISSING)
+        heap['ends'].append(MISSING)
+        return
+    # UTF-8: one non-ASCII character would make a str heap 2-4 bytes per character
+    data = value.encode('utf-8')
+    heap['starts'].append(heap['length'])
+    heap['length'] += len(data)
+    heap['ends'].append(heap['length'])
+    heap['pending'].append(data)
+
+def heap_get(heap, row):
+    if row in heap['overlay']:
+        return heap['overlay'][row]
+    start = heap['starts'][row]
+    if start == MISSING:
+        return None
+    if heap['pending']:
+        # Appended text is joined into the heap on first read
+        heap['data'] += b''.join(heap['pending'])
+        heap['pending'] = []
+    return heap['data'][start:heap['ends'][row]].decode('utf-8')
+
+def append_term(table, record):
+    """Add one term dict; returns its row number"""
+    row = table['size']
+    for field in INTERNED_FIELDS:
+        table['ids'][field].append(intern_value(table, field, record.get(field)))
+    for field in HEAP_FIELDS:
+        heap_append(table['heaps'][field], record.get(field))
+    for field in SPAN_FIELDS:
+        starts, ends = table['spans'][field]
+        start, end = record.get(field) or (MISSING, MISSING)
+        starts.append(start)
+        ends.append(end)
+    for field in NUMBER_FIELDS:
+        value = record.get(field)
+        table['numbers'][field].append(MISSING if value is None else value)
+    extras = {key: value for key, value in record.items() if key not in FIELDS}
+    if extras:
+        table['extras'][row] = extras
+    table['size'] += 1
+    return row
+
+def get_value(table, row, field):
+    """Value of a field in a row, None if the row has none"""
+    if field in table['heaps']:
+        return heap_get(table['heaps'][field], row)
+    if field in table['ids']:
+        value_id = table['ids'][field][row]
+        return None if value_id == MISSING else table['values'][field][value_id]
+    if field in table['spans']:
+        starts, ends = table['spans'][field]
+        return None if starts[row] == MISSING else [starts[row], ends[row]]
+    if field in table['numbers']:
+        value = table['numbers'][field][row]
+        return None if value == MISSING else value
+    return table['extras'].get(row, {}).get(field)
+
+def set_value(table, row, field, value):
+    """Set (or with None, remove) a field of a row"""
+    if field in table['heaps']:
+        table['heaps'][field]['overlay'][row] = value
+    elif field in table['ids']:
+        table['ids'][field][row] = intern_value(table, field, value)
+    elif field in table['spans']:
+        starts, ends = table['spans'][field]
+        starts[row], ends[row] = value or (MISSING, MISSING)
+    elif field in table['numbers']:
+        table['numbers'][field][row] = MISSING if value is None else value
+    elif value is None:
+        table['extras'].get(row, {}).pop(field, None)
+    else:
+        table['extras'].setdefault(row, {})[field] = value
+
+def term_record(table, row):
+    """Row as the dict the JSON files hold"""
+    record = {}
+    for field in FIELDS:
+        value = get_value(table, row, field)
+        if value is not None:
+            record[field] = value
+    record.update(table['extras'].get(row, {}))
+    return record
+
+class TermRow:
+    """Dict-like view of one table row"""
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        value = get_value(self.table, self.row, field)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def get(self, field, default=None):
+        value = get_value(self.table, self.row, field)
+        return default if value is None else value
+
+    def __setitem__(self, field, value):
+        set_value(self.table, self.row, field, value)
+
+    def __contains__(self, field):
+        return get_value(self.table, self.row, field) is not None
+
+    def keys(self):
+        return term_record(self.table, self.row).keys()
+
+    def __repr__(self):
+        return f"TermRow({self.row}, {self.get('term')!r})"
+
+def rows(table, group=None):
+    """Row views of the whole table, or of one group"""
+    numbers = range(table['size']) if group is None else table['groups'][group]
+    for row in numbers:
+        yield TermRow(table, row)
+
+def table_from_records(records):
+    """Table of an iterable of term dicts (a list, or a generator from read_ndjson)"""
+    table = new_table()
+    for record in records:
+        append_term(table, record)
+    return table
+
+def load_table(path):
+    """Table of a term file: JSON list, JSON category -> terms dict, or NDJSON"""
+    if path.endswith('.ndjson'):
+        return table_from_records(read_ndjson(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return table_from_records(data)
+    table = new_table()
+    table['groups'] = {key: array('I', (append_term(table, record) for record in records))
+                       for key, records in data.items()}
+    return table
+
+def table_data(table):
+    """The table in the shape it was loaded from (list or group -> list)"""
+    if table['groups'] is None:
+        return [term_record(table, row) for row in range(table['size'])]
+    return {key: [term_record(table, row) for row in numbers]
+            for key, numbers in table['groups'].items()}
+
+def save_table(table, path, indent=2):
+    """Write the table back as JSON (or NDJSON, one row at a time)"""
+    if path.endswith('.ndjson'):
+        return write_ndjson((term_record(table, row) for row in range(table['size'])), path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table_data(table), f, ensure_ascii=False, indent=indent)
+    return table['size']
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Fuzzy caption matching only accepts spelling variants
+
+Run with: python3 -m pytest test_caption_matcher.py
+"""
+import pytest
+
+from caption_matcher import build_term_index, match_caption
+
+def match_types(term, caption):
+    """match_type of every match of a one-term index in a caption"""
+    return [match['match_type'] for match in match_caption(build_term_index([term]), caption)]
+
+# Near misses seen on the real captions: another word, often the opposite finding
+@pytest.mark.parametrize('term, caption', [
+    ('Microcephaly', 'Macrocephaly in a child'),
+    ('Microcephaly', 'Acrocephaly and brachydactyly'),
+    ('Clinodactyly', 'Oligodactyly of the left hand'),
+    ('Toes, Widely Spaced', 'The eyes, widely spaced, are also shown'),
+    ('Hand, Small', 'The patient has small ears'),
+    ('Hand, Absent', 'Thumb and absent radius'),
+    ('Face, Narrow', 'The palpebral fissures are narrow'),
+])
+def test_near_misses_do_not_match(term, caption):
+    assert match_types(term, caption) == []
+
+@pytest.mark.parametrize('term, caption', [
+    ('Palpebral Fissure, Long', 'Long palpebral fissures'),
+    ('Nail, Hyperconvex', 'Nails, hyperconvex'),
+    ('Supraorbital Ridge, Prominent', 'Prominent supra-orbital ridges'),
+    ('Fissure, Palpebral', 'The palpe bral fissure'),
+    ('Digital Constriction Ring', 'Digital constriction rings'),
+])
+def test_spelling_variants_match(term, caption):
+    assert match_types(term, caption) == ['fuzzy']
+
+def test_fuzzy_match_reports_the_caption_range():
+    caption = 'Deep palmar creases in both hands'
+    match, = match_caption(build_term_index(['Palmar Crease, Deep']), caption)
+    assert [caption[start:end] for start, end in match['caption_spans']] == ['Deep palmar creases']
+    assert 0.8 <= match['confidence'] < 1
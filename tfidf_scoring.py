@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+TF-IDF term-caption similarity (requires pip install numpy scipy)
+
+The mapping scripts score each term-caption pair with their own rules
+(exact/partial/fuzzy in caption_matcher.py, component lengths in
+improve_compound_terms.py), so a score means something different per
+script and is not comparable between documents. This module scores every
+term against every caption in one batch:
+
+    1. Terms, definitions and captions are tokenized like the caption
+       matcher (normalize_term) into sparse word-count matrices sharing
+       one vocabulary.
+    2. Counts become TF-IDF weights: sublinear tf (1 + log count) times a
+       smoothed idf, log((1 + n) / (1 + df)) + 1, over all n texts.
+    3. A term vector is its name's TF-IDF plus DEFINITION_WEIGHT times its
+       definition's; term and caption vectors are L2-normalized.
+    4. similarity_matrix() is one sparse product, terms x captions of
+       cosine similarities in [0, 1]; top_matches() keeps each term's
+       best captions above a threshold with array operations only;
+       rank_pairs() does the same over given candidate pairs.
+"""
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from caption_matcher import normalize_term
+
+# Weight of a term's definition words relative to the words of its name
+DEFINITION_WEIGHT = 0.3
+# Lowest cosine similarity kept, and captions kept per term
+MIN_SCORE = 0.3
+TOP_K = 6
+
+def count_rows(texts, vocabulary):
+    """(data, indices, indptr) word counts of texts; new words are added to vocabulary"""
+    data, indices, indptr = [], [], [0]
+    for text in texts:
+        counts = Counter(vocabulary.setdefault(word, len(vocabulary))
+                         for word in normalize_term(text or '').split())
+        indices.extend(counts)
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return data, indices, indptr
+
+def count_matrix(rows, width):
+    data, indices, indptr = rows
+    return sparse.csr_matrix((np.array(data, dtype=np.float64), indices, indptr),
+                             shape=(len(indptr) - 1, width))
+
+def tfidf(counts, idf):
+    """Sublinear tf times idf (not normalized)"""
+    weights = counts.copy()
+    weights.data = 1 + np.log(weights.data)
+    return weights @ sparse.diags(idf)
+
+def normalize_rows(matrix):
+    """Rows scaled to unit length; empty rows stay empty"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+def similarity_matrix(terms, definitions, captions):
+    """Sparse terms x captions matrix of TF-IDF cosine similarities.
+
+    definitions is parallel to terms (None or '' for terms without one).
+    """
+    vocabulary = {}
+    rows = [count_rows(texts, vocabulary) for texts in (terms, definitions, captions)]
+    term_counts, definition_counts, caption_counts = (count_matrix(r, len(vocabulary)) for r in rows)
+
+    # Document frequency over every text: names, definitions and captions
+    texts = sparse.vstack([term_counts, definition_counts, caption_counts]).tocsc()
+    document_frequency = np.diff(texts.indptr)
+    idf = np.log((1 + texts.shape[0]) / (1 + document_frequency)) + 1
+
+    term_vectors = normalize_rows(tfidf(term_counts, idf) + DEFINITION_WEIGHT * tfidf(definition_counts, idf))
+    caption_vectors = normalize_rows(tfidf(caption_counts, idf))
+    return (term_vectors @ caption_vectors.T).tocsr()
+
+def top_matches(scores, k=TOP_K, min_score=MIN_SCORE):
+    """(term rows, caption columns, scores) of each term's k best captions scoring at least min_score.
+
+    Sorted by term row, then best score first (ties by caption column).
+    """
+    scores = scores.tocoo()
+    keep = scores.data >= min_score
+    rows, columns, values = scores.row[keep], scores.col[keep], scores.data[keep]
+    order = np.lexsort((columns, -values, rows))
+    rows, columns, values = rows[order], columns[order], values[order]
+    # Rank of each entry within its row: position minus the row's first position
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+    keep = rank < k
+    return rows[keep], columns[keep], values[keep]
+
+def rank_pairs(scores, rows, columns, k=TOP_K, min_score=MIN_SCORE):
+    """Candidate (row, column) pairs each row keeps: (pair indices, scores) of its k best
+    scoring at least min_score, by row and best first (ties in candidate order)"""
+    rows = np.asarray(rows, dtype=np.int64)
+    if not len(rows):
+        return rows, np.zeros(0)
+    values = np.asarray(scores[rows, np.asarray(columns, dtype=np.int64)]).ravel()
+    # One column per candidate pair, so top_matches ranks the candidates of each row
+    candidates = sparse.coo_matrix((values, (rows, np.arange(len(rows)))), shape=(scores.shape[0], len(rows)))
+    _, pairs, kept = top_matches(candidates, k, min_score)
+    return pairs, kept
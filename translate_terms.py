@@ -2,11 +2,12 @@
 """
 Script para traducir términos médicos al español
 """
-import json
 import os
 import time
 from deep_translator import GoogleTranslator
 
+from term_table import load_table, rows, save_table
+
 def translate_text(text, max_retries=3):
     """Traduce texto al español con reintentos"""
     if not text or text.strip() == "":
@@ -42,20 +43,18 @@ def translate_text(text, max_retries=3):
     return text
 
 def translate_term_entry(entry, index, total):
-    """Traduce una entrada de término"""
+    """Traduce una entrada de término (fila de la tabla, en su lugar)"""
     print(f"[{index}/{total}] Traduciendo: {entry.get('term', 'Unknown')}")
     
-    translated = entry.copy()
-    
     # Traducir definición
     if 'definition' in entry and entry['definition']:
         print(f"  - Traduciendo definición...")
-        translated['definition'] = translate_text(entry['definition'])
+        entry['definition'] = translate_text(entry['definition'])
     
     # Traducir comentario
     if 'comment' in entry and entry['comment']:
         print(f"  - Traduciendo comentario...")
-        translated['comment'] = translate_text(entry['comment'])
+        entry['comment'] = translate_text(entry['comment'])
     
     # Traducir categoría
     if 'category' in entry and entry['category']:
@@ -73,9 +72,9 @@ def translate_term_entry(entry, index, total):
             'teeth': 'dientes',
             'general': 'general'
         }
-        translated['category'] = category_map.get(entry['category'], entry['category'])
+        entry['category'] = category_map.get(entry['category'], entry['category'])
     
-    return translated
+    return entry
 
 def translate_json_file(input_file, output_file):
     """Traduce un archivo JSON completo"""
@@ -83,30 +82,21 @@ def translate_json_file(input_file, output_file):
     print(f"Procesando: {input_file}")
     print(f"{'='*60}\n")
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # Tabla columnar: las filas se traducen en su lugar, sin copiar entradas
+    table = load_table(input_file)
     
-    if isinstance(data, dict):
-        translated_data = {}
-        for category, entries in data.items():
-            print(f"\n--- Categoría: {category} ({len(entries)} términos) ---")
-            translated_entries = []
-            for i, entry in enumerate(entries, 1):
-                translated_entry = translate_term_entry(entry, i, len(entries))
-                translated_entries.append(translated_entry)
-            translated_data[category] = translated_entries
-    elif isinstance(data, list):
-        print(f"Total de términos: {len(data)}")
-        translated_data = []
-        for i, entry in enumerate(data, 1):
-            translated_entry = translate_term_entry(entry, i, len(data))
-            translated_data.append(translated_entry)
+    if table['groups'] is not None:
+        for category, numbers in table['groups'].items():
+            print(f"\n--- Categoría: {category} ({len(numbers)} términos) ---")
+            for i, entry in enumerate(rows(table, category), 1):
+                translate_term_entry(entry, i, len(numbers))
     else:
-        translated_data = data
+        print(f"Total de términos: {table['size']}")
+        for i, entry in enumerate(rows(table), 1):
+            translate_term_entry(entry, i, table['size'])
     
-    # Guardar resultado
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(translated_data, f, ensure_ascii=False, indent=2)
+    # Guardar resultado (misma forma JSON que la entrada)
+    save_table(table, output_file)
     
     print(f"\n✓ Guardado en: {output_file}\n")
 
@@ -26,6 +26,7 @@ def check_files():
         'Scripts': [
             'extract_pdfs.py',
             'extract_terms.py',
+            'term_extraction.py',
             'organize_content.py',
             'create_sample.py',
         ],